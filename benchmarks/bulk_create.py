@@ -0,0 +1,69 @@
+"""Скорость создания постов: по одному через POST /posts/create
+против пакетов через POST /posts/bulk.
+
+Запуск: python -m benchmarks.bulk_create [число_постов]
+"""
+import asyncio
+import sys
+import time
+
+from benchmarks.common import load_app
+
+POSTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+BULK_SIZE = 500
+CATEGORIES = 10
+
+
+async def main():
+    app = load_app()
+
+    import httpx
+    from sqlalchemy import func, select
+    from category_post.models import Category
+    from database.base import AsyncSessionLocal, async_engine
+    from posts.models import Post
+    from users.models import User
+    from users.utils import get_current_user
+
+    async with AsyncSessionLocal() as db:
+        user = User(username="bench", password="-")
+        db.add(user)
+        db.add_all(Category(title=f"category{i}") for i in range(CATEGORIES))
+        await db.commit()
+        user_id = user.id
+        category_ids = list((await db.scalars(select(Category.id))).all())
+
+    async def bench_user():
+        async with AsyncSessionLocal() as db:
+            return await db.get(User, user_id)
+
+    app.dependency_overrides[get_current_user] = bench_user
+
+    def payload(i):
+        return {"title": f"post {i}", "content": "text " * 20,
+                "categories": [category_ids[i % CATEGORIES], category_ids[(i + 1) % CATEGORIES]]}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for i in range(POSTS):
+            response = await client.post("/posts/create", json=payload(i))
+            assert response.status_code == 200, response.text
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for offset in range(0, POSTS, BULK_SIZE):
+            response = await client.post("/posts/bulk", json=[payload(i) for i in range(offset, min(POSTS, offset + BULK_SIZE))])
+            assert response.status_code == 200 and all(item["created"] for item in response.json()), response.text
+        bulk = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(func.count()).select_from(Post)) == 2 * POSTS
+    await async_engine.dispose()
+
+    print(f"/posts/create  {POSTS} постов за {single:6.2f}s  {POSTS / single:8.1f} постов/с")
+    print(f"/posts/bulk    {POSTS} постов за {bulk:6.2f}s  {POSTS / bulk:8.1f} постов/с  x{single / bulk:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""Каталог категорий в памяти.
+
+страница постов:
+  было:  второй запрос SELECT ... IN с JOIN categories на каждую страницу (selectinload)
+  стало: id категорий подзапросом в том же запросе, названия из каталога
+проверка категорий при создании поста:
+  было:  SELECT id FROM categories WHERE id IN (...)
+  стало: поиск в снимке каталога, база не читается
+гонка при добавлении категории (CONCURRENCY запросов с одним названием):
+  было:  SELECT по названию, потом INSERT - проигравшие падают на уникальном индексе
+  стало: INSERT ... ON CONFLICT DO NOTHING RETURNING
+
+Запуск: python -m benchmarks.category_catalog
+"""
+import asyncio
+import time
+
+from benchmarks.common import load_app
+
+POSTS = 5000
+CATEGORIES = 50
+PAGE = 500
+ROUNDS = 50
+CONCURRENCY = 10  # не больше пула соединений, иначе барьер не дождется всех
+
+
+async def main():
+    app = load_app()
+
+    from sqlalchemy import event, insert, select
+    from sqlalchemy.exc import IntegrityError
+    from sqlalchemy.orm import joinedload, load_only, selectinload
+    from category_post.catalog import category_catalog
+    from category_post.models import Category, category_post
+    from category_post.routers import register_categories_routers
+    from category_post.scheme import CategoryScheme
+    from database.base import AsyncSessionLocal, async_engine, engine
+    from posts.models import Post
+    from posts.queries import load_categories, post_summary_query
+    from posts.scheme import PostSummary
+    from users.models import User
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"username": "author", "password": "-"}])
+        connection.execute(insert(Category), [{"title": f"category{i}"} for i in range(CATEGORIES)])
+        connection.execute(insert(Post), [{"title": f"post {i}", "content": "text", "user_id": 1} for i in range(POSTS)])
+        connection.execute(category_post.insert(), [{"post_id": post_id, "category_id": 1 + (post_id + k) % CATEGORIES}
+                                                    for post_id in range(1, POSTS + 1) for k in range(3)])
+
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    def old_query():
+        return select(Post).options(
+            load_only(Post.id, Post.title, Post.content, Post.user_id),
+            joinedload(Post.author).load_only(User.username),
+            selectinload(Post.categories).load_only(Category.title),
+        )
+
+    def old_summary(post):
+        return PostSummary(id=post.id, title=post.title, content=post.content, user_id=post.user_id,
+                           author=post.author.username, categories=[category.title for category in post.categories])
+
+    async def old_page(db, offset):
+        posts = (await db.scalars(old_query().where(Post.id > offset).order_by(Post.id).limit(PAGE))).all()
+        return [old_summary(post) for post in posts]
+
+    async def new_page(db, offset):
+        posts = (await db.scalars(post_summary_query().where(Post.id > offset).order_by(Post.id).limit(PAGE))).all()
+        await load_categories(db, posts)
+        return [PostSummary.from_post(post) for post in posts]
+
+    async def old_check(db, ids):
+        return set((await db.scalars(select(Category.id).where(Category.id.in_(ids)))).all())
+
+    async def new_check(db, ids):
+        return ids - await category_catalog.missing(db, ids)
+
+    async def measure(name, func, make_args):
+        async with AsyncSessionLocal() as db:
+            await func(db, *make_args(0))  # прогрев
+            statements.clear()
+            started = time.perf_counter()
+            for index in range(ROUNDS):
+                result = await func(db, *make_args(index))
+            elapsed = (time.perf_counter() - started) / ROUNDS
+        print(f"{name:<34} {elapsed * 1000:8.2f}ms  запросов={len(statements) / ROUNDS:.0f}")
+        return result
+
+    await category_catalog.start()
+    print(f"постов: {POSTS}, категорий: {CATEGORIES}, страница: {PAGE}")
+    pages = lambda index: ((index * PAGE) % POSTS,)
+    before = await measure("было: страница, selectinload", old_page, pages)
+    after = await measure("стало: страница, каталог", new_page, pages)
+    assert [item.model_dump() for item in before] == [item.model_dump() for item in after]
+    checks = lambda index: ({1 + (index + k) % CATEGORIES for k in range(5)},)
+    await measure("было: проверка категорий, SELECT", old_check, checks)
+    await measure("стало: проверка категорий, каталог", new_check, checks)
+
+    # все проверки проходят до первой вставки, как у одновременных запросов в разных воркерах
+    checked = asyncio.Barrier(CONCURRENCY)
+
+    async def old_add(title):
+        async with AsyncSessionLocal() as db:
+            exists = await db.scalar(select(Category).where(Category.title == title))
+            await checked.wait()
+            if exists:
+                return "exists"
+            db.add(Category(title=title))
+            try:
+                await db.commit()
+            except IntegrityError:
+                return "error"
+            return "created"
+
+    add_category = next(route.endpoint for route in register_categories_routers().routes if route.name == "add_category")
+
+    async def new_add(title):
+        async with AsyncSessionLocal() as db:
+            message = (await add_category(CategoryScheme(title=title), db))["message"]
+        return "created" if "добавлена" in message else "exists"
+
+    for name, add in (("было: SELECT + INSERT", old_add), ("стало: ON CONFLICT DO NOTHING", new_add)):
+        title = f"race {name}"
+        results = await asyncio.gather(*[add(title) for _ in range(CONCURRENCY)])
+        print(f"{name:<34} " + ", ".join(f"{result}={results.count(result)}" for result in ("created", "exists", "error")))
+    assert category_catalog.snapshot.ids.get("race стало: ON CONFLICT DO NOTHING") is not None
+    print(f"каталог: {category_catalog.stats()}")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
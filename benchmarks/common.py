@@ -0,0 +1,48 @@
+"""Общие помощники для нагрузочных тестов.
+
+Приложение запускается в процессе через ASGI-транспорт httpx, а база
+создается во временной директории, чтобы не трогать ./database.db.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app():
+    """Импортирует main.app с чистой базой во временной директории"""
+    workdir = tempfile.mkdtemp(prefix="blog_bench_")
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.chdir(workdir)  # DATABASE_URL относительный, база появится здесь
+    # нагрузка идет от одного клиента, лимиты частоты ее бы отсекли (их стоимость - в benchmarks.rate_limit)
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    from main import app
+    return app
+
+
+def percentile(values, pct):
+    """Перцентиль по отсортированной выборке (pct от 0 до 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(name, latencies, elapsed):
+    """Строка отчета: пропускная способность и задержки в миллисекундах"""
+    return (f"{name:<28} n={len(latencies):<6} rps={len(latencies) / elapsed:8.1f} "
+            f"p50={percentile(latencies, 50) * 1000:7.2f}ms "
+            f"p95={percentile(latencies, 95) * 1000:7.2f}ms "
+            f"p99={percentile(latencies, 99) * 1000:7.2f}ms")
+
+
+async def timed(coro_factory, latencies):
+    """Выполняет запрос и добавляет его длительность в latencies"""
+    started = time.perf_counter()
+    response = await coro_factory()
+    latencies.append(time.perf_counter() - started)
+    return response
@@ -0,0 +1,107 @@
+"""Задержка /feed/next и /feed/swipe в зависимости от длины истории свайпов.
+
+Создаются POSTS постов и пользователи с историей 0, 1k, 10k и 100k случайных
+просмотренных постов. История набирается через POST /feed/swipe пачками по
+MAX_SWIPES, затем каждый пользователь листает ленту: /feed/next и свайп
+полученной пачки. Время ответа не должно расти вместе с историей.
+
+Запуск: python -m benchmarks.feed_history [число_постов]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.common import load_app, summary
+
+POSTS = int(sys.argv[1]) if len(sys.argv) > 1 else 120_000
+HISTORIES = [0, 1_000, 10_000, 100_000]
+CATEGORIES = 20
+ROUNDS = 200
+LIMIT = 20
+
+
+async def main():
+    app = load_app()
+    random.seed(13)
+
+    import httpx
+    from fastapi import Request
+    from sqlalchemy import func, insert, select
+    from category_post.models import Category, category_post
+    from database.base import async_engine, engine, read_engine
+    from feed.models import feed_seen
+    from feed.queues import feed_queues
+    from feed.utils import MAX_SWIPES
+    from posts.models import Post
+    from users.models import User
+    from users.utils import get_current_user
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"username": "author", "password": "-"}] +
+                           [{"username": f"reader{size}", "password": "-"} for size in HISTORIES])
+        connection.execute(insert(Category), [{"title": f"category{i}"} for i in range(CATEGORIES)])
+        connection.execute(insert(Post), [{"title": f"post {i}", "content": "text", "user_id": 1} for i in range(POSTS)])
+        connection.execute(category_post.insert(), [
+            {"post_id": post_id, "category_id": post_id % CATEGORIES + 1} for post_id in range(1, POSTS + 1)
+        ])
+        readers = dict(zip(HISTORIES, connection.execute(select(User.id).where(User.id > 1).order_by(User.id)).scalars()))
+
+    async def bench_user(request: Request):
+        return User(id=int(request.headers["x-user"]))
+
+    app.dependency_overrides[get_current_user] = bench_user
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"постов: {POSTS}")
+        for size, user_id in readers.items():
+            headers = {"x-user": str(user_id)}
+            history = random.sample(range(1, POSTS + 1), size)
+            started = time.perf_counter()
+            for offset in range(0, size, MAX_SWIPES):
+                batch = [{"post_id": post_id, "action": "like" if post_id % 7 == 0 else "skip"}
+                         for post_id in history[offset:offset + MAX_SWIPES]]
+                response = await client.post("/feed/swipe", json=batch, headers=headers)
+                assert response.status_code == 200, response.text
+            load = time.perf_counter() - started
+
+            async with async_engine.connect() as connection:
+                stored = await connection.scalar(
+                    select(func.coalesce(func.sum(func.length(feed_seen.c.seen) + func.length(feed_seen.c.liked)), 0))
+                    .where(feed_seen.c.user_id == user_id)
+                )
+
+            # первый запрос грузит историю и заполняет очередь
+            response = await client.get(f"/feed/next?limit={LIMIT}", headers=headers)
+            assert response.status_code == 200, response.text
+
+            next_latencies, swipe_latencies = [], []
+            shown = set()
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                request_started = time.perf_counter()
+                response = await client.get(f"/feed/next?limit={LIMIT}", headers=headers)
+                next_latencies.append(time.perf_counter() - request_started)
+                posts = response.json()
+                assert posts and not shown & {post["id"] for post in posts}
+                shown.update(post["id"] for post in posts)
+                request_started = time.perf_counter()
+                response = await client.post("/feed/swipe", headers=headers,
+                                             json=[{"post_id": post["id"], "action": "skip"} for post in posts])
+                swipe_latencies.append(time.perf_counter() - request_started)
+                assert response.status_code == 200, response.text
+            elapsed = time.perf_counter() - started
+
+            assert not shown & set(history), "лента показала просмотренный пост"
+            print(f"история {size:>7}: загружена за {load:6.2f}s, хранится {stored / 1024:7.1f} КБ")
+            print("  " + summary("GET /feed/next", next_latencies, elapsed))
+            print("  " + summary("POST /feed/swipe", swipe_latencies, elapsed))
+
+    await feed_queues.shutdown()
+    await async_engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""Генератор синтетических данных для нагрузочных тестов.
+
+Заполняет пустую базу пользователями, категориями, постами и связями
+пост-категория. Один и тот же seed дает одну и ту же базу, поэтому
+прогоны на разных коммитах сравнимы. Вставка идет пачками через Core
+в одной транзакции; триггеры поиска и счетчиков категорий срабатывают
+как при обычной записи.
+
+У всех пользователей (user0, user1, ...) пароль PASSWORD: хеш считается
+один раз с текущими настройками bcrypt.
+
+Запуск: python -m benchmarks.generator --users 1000 --posts 100000 --categories 50
+(пишет в DATABASE_URL, по умолчанию ./database.db)
+"""
+import argparse
+import importlib
+import itertools
+import random
+import time
+
+from sqlalchemy import Engine, func, insert, select
+
+PASSWORD = "bench-password"
+INSERT_BATCH = 5000
+MAX_CATEGORIES_PER_POST = 3
+WORDS = (
+    "блог лента пост категория музыка спорт кино книги код python fastapi sqlite база индекс запрос "
+    "кеш очередь поток задержка нагрузка город море горы кофе утро вечер новости обзор заметка идея"
+).split()
+
+
+def generate(engine: Engine, users: int, posts: int, categories: int, seed: int = 1) -> dict:
+    """Заполняет пустую базу, возвращает число вставленных строк по таблицам.
+    Авторы и категории постов выбираются с перекосом: у первых пользователей
+    и категорий постов больше, как в живых данных."""
+    from category_post.models import Category, category_post
+    from posts.models import Post
+    from users.hashing import pwd_context
+    from users.models import User
+
+    rng = random.Random(seed)
+    password = pwd_context.hash(PASSWORD)
+    author_weights = list(itertools.accumulate(1 / (i + 1) for i in range(users)))
+    category_weights = list(itertools.accumulate(1 / (i + 1) for i in range(categories)))
+
+    with engine.begin() as connection:
+        if connection.scalar(select(func.count()).select_from(User)) or connection.scalar(select(func.count()).select_from(Post)):
+            raise ValueError("База не пустая, генератор заполняет только новую базу")
+        connection.execute(insert(User), [{"username": f"user{i}", "password": password} for i in range(users)])
+        connection.execute(insert(Category), [{"title": f"category{i}"} for i in range(categories)])
+        user_ids = connection.scalars(select(User.id).order_by(User.id)).all()
+        category_ids = connection.scalars(select(Category.id).order_by(Category.id)).all()
+
+        # в новой таблице SQLite выдает id подряд, начиная с max(id) + 1
+        first_post_id = (connection.scalar(select(func.max(Post.id))) or 0) + 1
+        associations = 0
+        for offset in range(0, posts, INSERT_BATCH):
+            size = min(INSERT_BATCH, posts - offset)
+            connection.execute(insert(Post), [
+                {
+                    "title": " ".join(rng.choices(WORDS, k=rng.randint(2, 5)))[:50],
+                    "content": " ".join(rng.choices(WORDS, k=rng.randint(10, 30)))[:255],
+                    "user_id": rng.choices(user_ids, cum_weights=author_weights)[0],
+                }
+                for _ in range(size)
+            ])
+            rows = [
+                {"post_id": first_post_id + offset + i, "category_id": category_id}
+                for i in range(size)
+                for category_id in set(rng.choices(category_ids, cum_weights=category_weights,
+                                                   k=rng.randint(0, MAX_CATEGORIES_PER_POST)))
+            ] if category_ids else []
+            if rows:
+                connection.execute(category_post.insert(), rows)
+            associations += len(rows)
+    return {"users": users, "categories": categories, "posts": posts, "category_post": associations}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические данные для нагрузочных тестов")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    importlib.import_module("main")  # регистрирует все модели и создает таблицы
+    from database.base import engine
+
+    started = time.perf_counter()
+    counts = generate(engine, args.users, args.posts, args.categories, args.seed)
+    print(f"{counts} за {time.perf_counter() - started:.1f}s, пароль пользователей: {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
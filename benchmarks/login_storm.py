@@ -0,0 +1,54 @@
+"""Пропускная способность и хвостовые задержки POST /users/login/.
+
+Каждый уровень параллелизма работает DURATION секунд. Ответы 503
+означают, что пул bcrypt переполнен и запрос отклонен сразу.
+
+Запуск: python -m benchmarks.login_storm
+"""
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.common import load_app, summary, timed
+
+CONCURRENCY = (1, 8, 64)
+DURATION = 3.0
+
+
+async def main():
+    app = load_app()
+
+    import httpx
+    from database.base import AsyncSessionLocal, async_engine
+    from users.hashing import password_hasher
+    from users.models import User
+
+    async with AsyncSessionLocal() as db:
+        db.add(User(username="bench", password=await password_hasher.hash("secret")))
+        await db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login(latencies, statuses, deadline):
+            while time.perf_counter() < deadline:
+                response = await timed(lambda: client.post("/users/login/", data={"username": "bench", "password": "secret"}),
+                                       latencies)
+                statuses[response.status_code] += 1
+                if response.status_code == 503:
+                    await asyncio.sleep(0.01)
+
+        for clients in CONCURRENCY:
+            latencies, statuses = [], Counter()
+            deadline = time.perf_counter() + DURATION
+            started = time.perf_counter()
+            await asyncio.gather(*[login(latencies, statuses, deadline) for _ in range(clients)])
+            elapsed = time.perf_counter() - started
+            ok = statuses[200]
+            print(summary(f"login c={clients}", latencies, elapsed), f"ok/s={ok / elapsed:6.1f}", dict(statuses))
+
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""Накладные расходы MetricsMiddleware и хуков SQLAlchemy.
+
+Один и тот же маршрут с запросом SELECT 1 вызывается без инструментирования
+и с ним; сравнивается среднее время запроса.
+
+Запуск: python -m benchmarks.metrics_overhead
+"""
+import asyncio
+import time
+
+from benchmarks.common import percentile
+
+REQUESTS = 3000
+WARMUP = 200
+
+
+async def measure(app, path):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(WARMUP):
+            await client.get(path)
+        latencies = []
+        for _ in range(REQUESTS):
+            started = time.perf_counter()
+            await client.get(path)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def build_app(instrumented: bool):
+    from fastapi import FastAPI
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from monitoring.middleware import MetricsMiddleware, instrument_engine
+
+    # отдельный движок на каждый вариант, чтобы хуки не попали в замер без метрик
+    engine = create_async_engine("sqlite+aiosqlite://")
+    sessions = async_sessionmaker(engine)
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(MetricsMiddleware, slow_request_seconds=60)
+        instrument_engine(engine.sync_engine)
+
+    @app.get("/ping/{id}")
+    async def ping(id: int):
+        async with sessions() as db:
+            await db.execute(text("SELECT 1"))
+        return {"id": id}
+
+    return app, engine
+
+
+async def main():
+    results = {}
+    for name, instrumented in (("без метрик", False), ("с метриками", True)):
+        app, engine = build_app(instrumented)
+        results[name] = await measure(app, "/ping/1")
+        await engine.dispose()
+
+    for name, latencies in results.items():
+        mean = sum(latencies) / len(latencies)
+        print(f"{name:<12} mean={mean * 1e6:8.1f}us p50={percentile(latencies, 50) * 1e6:8.1f}us "
+              f"p99={percentile(latencies, 99) * 1e6:8.1f}us")
+    plain, instrumented = (sum(latencies) / len(latencies) for latencies in results.values())
+    print(f"накладные расходы: {(instrumented - plain) * 1e6:.1f}us на запрос ({(instrumented / plain - 1) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
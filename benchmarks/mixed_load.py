@@ -0,0 +1,95 @@
+"""Смешанная нагрузка чтение/запись: настройки SQLite по умолчанию против WAL и PRAGMA.
+
+Каждая конфигурация запускается в отдельном процессе, потому что
+настройки движка читаются при импорте database.base.
+
+Запуск: python -m benchmarks.mixed_load
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from benchmarks.common import ROOT, load_app, summary, timed
+
+READERS = 16
+WRITERS = 4
+DURATION = float(os.environ.get("BENCH_DURATION", 5.0))
+SEED_POSTS = 2000
+CONFIGURATIONS = {
+    "по умолчанию": {"SQLITE_PRAGMAS": "false", "DB_POOL_SIZE": "5", "DB_READ_POOL_SIZE": "5"},
+    "WAL + PRAGMA + пул чтения": {"SQLITE_PRAGMAS": "true", "DB_POOL_SIZE": "2", "DB_READ_POOL_SIZE": "16"},
+}
+
+
+async def run():
+    app = load_app()
+
+    import httpx
+    from sqlalchemy import insert
+    from category_post.models import Category, category_post
+    from database.base import AsyncSessionLocal, async_engine, read_engine
+    from posts.models import Post
+    from users.models import User
+    from users.utils import get_current_user
+
+    async with AsyncSessionLocal() as db:
+        user = User(username="bench", password="-")
+        category = Category(title="bench")
+        db.add_all([user, category])
+        await db.flush()
+        post_ids = (await db.scalars(insert(Post).returning(Post.id), [
+            {"title": f"post {i}", "content": "text " * 30, "user_id": user.id} for i in range(SEED_POSTS)
+        ])).all()
+        await db.execute(category_post.insert(), [{"post_id": post_id, "category_id": category.id} for post_id in post_ids])
+        await db.commit()
+        user_id, category_id = user.id, category.id
+
+    async def bench_user():
+        async with AsyncSessionLocal() as db:
+            return await db.get(User, user_id)
+
+    app.dependency_overrides[get_current_user] = bench_user
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        reads, writes, statuses = [], [], Counter()
+        deadline = time.perf_counter() + DURATION
+
+        async def reader():
+            while time.perf_counter() < deadline:
+                response = await timed(lambda: client.get(f"/category/{category_id}/posts", params={"limit": 20}), reads)
+                statuses[response.status_code] += 1
+
+        async def writer():
+            while time.perf_counter() < deadline:
+                payload = [{"title": "w", "content": "w", "categories": [category_id]} for _ in range(20)]
+                response = await timed(lambda: client.post("/posts/bulk", json=payload), writes)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[reader() for _ in range(READERS)], *[writer() for _ in range(WRITERS)])
+        elapsed = time.perf_counter() - started
+
+    await async_engine.dispose()
+    await read_engine.dispose()
+    print(summary("  чтение", reads, elapsed))
+    print(summary("  запись", writes, elapsed))
+    print("  коды ответов:", dict(statuses))
+
+
+def main():
+    if "--run" in sys.argv:
+        asyncio.run(run())
+        return
+    for name, env in CONFIGURATIONS.items():
+        print(name)
+        sys.stdout.flush()
+        subprocess.run([sys.executable, "-m", "benchmarks.mixed_load", "--run"], cwd=ROOT,
+                       env={**os.environ, **env, "REVOCATION_BACKEND": "memory", "SLOW_REQUEST_SECONDS": "3600"}, check=True)
+
+
+if __name__ == "__main__":
+    main()
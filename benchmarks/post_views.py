@@ -0,0 +1,86 @@
+"""Учет просмотров в GET /posts/get/{id}.
+
+было:  upsert в post_views и коммит на каждое чтение - все читатели
+       выстраиваются в очередь за блокировкой записи SQLite
+стало: ViewCounter копит просмотры в памяти, запись одной пачкой
+
+Старый вариант повторен отдельным маршрутом с тем же кешем ответов.
+
+Запуск: python -m benchmarks.post_views
+"""
+import asyncio
+import random
+import time
+
+from benchmarks.common import load_app, summary, timed
+
+READERS = 16
+DURATION = 3.0
+SEED_POSTS = 1000
+
+
+async def main():
+    app = load_app()
+
+    import httpx
+    from fastapi import HTTPException, Request
+    from sqlalchemy import func, insert, select
+    from sqlalchemy.dialects.sqlite import insert as upsert
+    from database.base import AsyncReadSessionLocal, AsyncSessionLocal, async_engine, engine, read_engine
+    from http_cache.utils import POSTS, response_cache
+    from posts.models import Post, post_views
+    from posts.queries import load_categories, post_summary_query
+    from posts.scheme import PostSummary
+    from posts.views import view_counter
+    from users.models import User
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"username": "bench", "password": "-"}])
+        connection.execute(insert(Post), [{"title": f"post {i}", "content": "x" * 200, "user_id": 1} for i in range(SEED_POSTS)])
+
+    @app.get("/bench/posts/get/{id}")
+    async def get_post_with_update(request: Request, id: int):
+        async with AsyncSessionLocal() as db:
+            stmt = upsert(post_views)
+            await db.execute(stmt.on_conflict_do_update(index_elements=[post_views.c.post_id],
+                                                        set_={"views": post_views.c.views + 1}), {"post_id": id, "views": 1})
+            await db.commit()
+
+        async def build():
+            async with AsyncReadSessionLocal() as db:
+                post = await db.scalar(post_summary_query().where(Post.id == id))
+                await load_categories(db, [post] if post else [])
+            if post is None:
+                raise HTTPException(status_code=404, detail="Поста нет")
+            return PostSummary.from_post(post)
+        return await response_cache.respond(request, (POSTS,), build)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def reader(path, latencies, deadline):
+            while time.perf_counter() < deadline:
+                post_id = random.randint(1, SEED_POSTS)
+                response = await timed(lambda: client.get(f"{path}/{post_id}"), latencies)
+                assert response.status_code == 200, response.text
+
+        for name, path in (("было: UPDATE на чтение", "/bench/posts/get"), ("стало: ViewCounter", "/posts/get")):
+            latencies = []
+            deadline = time.perf_counter() + DURATION
+            started = time.perf_counter()
+            await asyncio.gather(*[reader(path, latencies, deadline) for _ in range(READERS)])
+            print(summary(name, latencies, time.perf_counter() - started))
+
+    pending, posts = sum(view_counter.pending.values()), len(view_counter.pending)
+    started = time.perf_counter()
+    await view_counter.flush()
+    print(f"запись {pending} просмотров по {posts} постам одной пачкой: "
+          f"{(time.perf_counter() - started) * 1000:.1f}ms")
+    async with AsyncSessionLocal() as db:
+        stored = await db.scalar(select(func.sum(post_views.c.views)))
+    print(f"всего просмотров в post_views: {stored}")
+    await async_engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
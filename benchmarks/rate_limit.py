@@ -0,0 +1,102 @@
+"""Накладные расходы RateLimitMiddleware.
+
+Маршрут без работы вызывается напрямую через ASGI (без httpx, чтобы
+клиент не заслонял разницу) CONCURRENCY задачами: без ограничения, с
+корзинами в памяти для анонимных клиентов (по IP) и для клиентов с JWT.
+Лимит большой, 429 не возникает - меряется только стоимость проверки.
+Если REDIS_URL доступен, тот же замер делается с Lua-скриптом в Redis.
+
+Запуск: python -m benchmarks.rate_limit
+"""
+import asyncio
+import time
+
+from benchmarks.common import percentile
+
+REQUESTS = 20_000
+CONCURRENCY = 50
+CLIENTS = 1000
+
+
+def build_app(limiter=None):
+    from fastapi import FastAPI
+    from ratelimit.middleware import RateLimitMiddleware
+
+    app = FastAPI()
+    if limiter is not None:
+        app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.get("/ping/{id}")
+    async def ping(id: int):
+        return {"id": id}
+
+    return app
+
+
+async def measure(app, tokens: list[str] | None) -> tuple[float, list[float]]:
+    """Пропускная способность и задержки REQUESTS запросов от CLIENTS клиентов"""
+    latencies = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def call(index):
+        headers = [(b"authorization", b"Bearer " + tokens[index % CLIENTS].encode())] if tokens else []
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": f"/ping/{index}", "raw_path": f"/ping/{index}".encode(),
+                 "query_string": b"", "headers": headers, "client": (f"10.0.{index % CLIENTS // 250}.{index % 250}", 1000),
+                 "server": ("bench", 80), "root_path": ""}
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        latencies.append(time.perf_counter() - started)
+
+    async def worker(offset):
+        for index in range(offset, REQUESTS, CONCURRENCY):
+            await call(index)
+
+    for index in range(CLIENTS):  # прогрев: корзины и кеш токенов уже созданы
+        await call(index)
+    latencies.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(offset) for offset in range(CONCURRENCY)])
+    return REQUESTS / (time.perf_counter() - started), latencies
+
+
+async def main():
+    from redis.exceptions import RedisError
+    from ratelimit.backends import MemoryRateLimitBackend, RedisRateLimitBackend
+    from ratelimit.utils import RateLimiter, parse_rules
+    from users.config import ASYNC_REDIS_CLIENT
+    from users.utils import create_access_token
+
+    rules = parse_rules(f"*={REQUESTS * 10}/60")
+    tokens = [create_access_token({"sub": f"user{i}"}) for i in range(CLIENTS)]
+    memory = MemoryRateLimitBackend(CLIENTS * 10)
+    variants = [
+        ("без ограничения", None, None),
+        ("память, по IP", RateLimiter(memory, rules, memory, 5), None),
+        ("память, по JWT", RateLimiter(memory, rules, memory, 5), tokens),
+    ]
+    try:
+        await ASYNC_REDIS_CLIENT.ping()
+        redis = RedisRateLimitBackend(ASYNC_REDIS_CLIENT)
+        variants += [("Redis, по IP", RateLimiter(redis, rules, memory, 5), None),
+                     ("Redis, по JWT", RateLimiter(redis, rules, memory, 5), tokens)]
+    except (RedisError, OSError) as error:
+        print(f"Redis недоступен ({error}), замер только в памяти")
+
+    baseline = None
+    for name, limiter, variant_tokens in variants:
+        rps, latencies = await measure(build_app(limiter), variant_tokens)
+        mean = sum(latencies) / len(latencies)
+        baseline = baseline or mean
+        print(f"{name:<18} rps={rps:8.0f} mean={mean * 1e6:7.1f}us p50={percentile(latencies, 50) * 1e6:7.1f}us "
+              f"p99={percentile(latencies, 99) * 1e6:7.1f}us  +{(mean - baseline) * 1e6:5.1f}us на запрос")
+    await ASYNC_REDIS_CLIENT.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
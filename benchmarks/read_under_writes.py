@@ -0,0 +1,71 @@
+"""Задержка GET /posts/get при параллельных POST /posts/create.
+
+Если обработчики блокируют event loop синхронными запросами к базе,
+p99 чтений растет вместе с числом писателей. С асинхронной сессией
+чтения должны оставаться на прежнем уровне.
+
+Запуск: python -m benchmarks.read_under_writes
+"""
+import asyncio
+import time
+
+from benchmarks.common import load_app, summary, timed
+
+READERS = 8
+WRITERS = 4
+DURATION = 3.0
+SEED_POSTS = 100
+
+
+async def main():
+    app = load_app()
+
+    import httpx
+    from sqlalchemy import select
+    from database.base import AsyncSessionLocal, async_engine
+    from posts.models import Post
+    from users.models import User
+    from users.utils import get_current_user
+
+    async with AsyncSessionLocal() as db:
+        user = User(username="bench", password="-")
+        db.add(user)
+        await db.flush()
+        db.add_all(Post(title=f"post {i}", content="x" * 200, user_id=user.id) for i in range(SEED_POSTS))
+        await db.commit()
+        user_id = user.id
+
+    async def bench_user():
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(User).where(User.id == user_id))
+
+    # авторизация не входит в замер, подставляем готового пользователя
+    app.dependency_overrides[get_current_user] = bench_user
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def reader(latencies, deadline):
+            while time.perf_counter() < deadline:
+                await timed(lambda: client.get("/posts/get"), latencies)
+
+        async def writer(latencies, deadline):
+            while time.perf_counter() < deadline:
+                await timed(lambda: client.post("/posts/create", json={"title": "w", "content": "w", "categories": []}),
+                            latencies)
+
+        for writers in (0, WRITERS):
+            reads, writes = [], []
+            deadline = time.perf_counter() + DURATION
+            started = time.perf_counter()
+            await asyncio.gather(*[reader(reads, deadline) for _ in range(READERS)],
+                                 *[writer(writes, deadline) for _ in range(writers)])
+            elapsed = time.perf_counter() - started
+            print(summary(f"GET /posts/get (w={writers})", reads, elapsed))
+            if writes:
+                print(summary(f"POST /posts/create (w={writers})", writes, elapsed))
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+"""Отчет нагрузочного прогона и сравнение двух отчетов.
+
+Recorder собирает задержки и коды ответов по эндпоинтам, отчет
+сохраняется в JSON вместе с коммитом и параметрами прогона.
+Сравнение помечает регрессии: рост p50/p95/p99 или падение
+пропускной способности больше порога, появление ошибок.
+
+Сравнение: python -m benchmarks.report старый.json новый.json [--threshold 0.2]
+Код возврата 1, если найдены регрессии.
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+from benchmarks.common import ROOT, percentile
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+# разница меньше этой считается шумом, даже если в процентах она большая
+MIN_LATENCY_DELTA_MS = 1.0
+# по меньшему числу запросов перцентили слишком шумные для сравнения
+MIN_SAMPLES = 50
+
+
+class Recorder:
+    """Задержки и коды ответов по эндпоинтам одного сценария"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.started: float | None = None
+        self.finished: float | None = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    async def request(self, client, method: str, endpoint: str, url: str, **kwargs):
+        """Запрос через httpx-клиент. endpoint - имя в отчете, например "GET /posts/get/{id}"."""
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def results(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+                "max_ms": round(max(latencies) * 1000, 3),
+                "errors": sum(count for code, count in statuses.items() if code >= 500),
+                "statuses": {str(code): count for code, count in sorted(statuses.items())},
+            }
+        return {"elapsed": round(elapsed, 3), "endpoints": endpoints}
+
+
+def git_commit() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def build_report(scenarios: dict[str, dict], params: dict) -> dict:
+    return {
+        "meta": {
+            **git_commit(),
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def save(report: dict, path: str):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list[str]:
+    """Регрессии current относительно baseline по эндпоинтам, которые есть в обоих отчетах
+    и набрали хотя бы MIN_SAMPLES запросов"""
+    regressions = []
+    for scenario, results in current["scenarios"].items():
+        old_endpoints = baseline["scenarios"].get(scenario, {}).get("endpoints", {})
+        for endpoint, new in results["endpoints"].items():
+            old = old_endpoints.get(endpoint)
+            if old is None or min(old["requests"], new["requests"]) < MIN_SAMPLES:
+                continue
+            name = f"{scenario}: {endpoint}"
+            for key in LATENCY_KEYS:
+                if new[key] - old[key] > MIN_LATENCY_DELTA_MS and new[key] > old[key] * (1 + threshold):
+                    regressions.append(f"{name} {key} {old[key]:.2f} -> {new[key]:.2f}")
+            if old["rps"] and new["rps"] < old["rps"] * (1 - threshold):
+                regressions.append(f"{name} rps {old['rps']:.1f} -> {new['rps']:.1f}")
+            old_rate = old["errors"] / max(old["requests"], 1)
+            new_rate = new["errors"] / max(new["requests"], 1)
+            if new_rate > old_rate + 0.01:
+                regressions.append(f"{name} ошибки {old_rate:.1%} -> {new_rate:.1%}")
+    return regressions
+
+
+def format_report(report: dict, baseline: dict | None = None) -> str:
+    """Таблица по эндпоинтам; с baseline рядом изменение p95 и rps"""
+    lines = []
+    for scenario, results in report["scenarios"].items():
+        lines.append(f"{scenario} ({results['elapsed']:.1f}s)")
+        old_endpoints = (baseline or {}).get("scenarios", {}).get(scenario, {}).get("endpoints", {})
+        for endpoint, stats in results["endpoints"].items():
+            line = (f"  {endpoint:<32} n={stats['requests']:<7} rps={stats['rps']:8.1f} "
+                    f"p50={stats['p50_ms']:8.2f}ms p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms "
+                    f"5xx={stats['errors']}")
+            old = old_endpoints.get(endpoint)
+            if old:
+                line += f"  p95 {_change(old['p95_ms'], stats['p95_ms'])} rps {_change(old['rps'], stats['rps'])}"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _change(old: float, new: float) -> str:
+    return f"{(new - old) / old:+.0%}" if old else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение двух отчетов нагрузочного прогона")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение, доля (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    print(f"{baseline['meta'].get('commit')} -> {current['meta'].get('commit')}")
+    print(format_report(current, baseline))
+    regressions = compare(baseline, current, args.threshold)
+    for regression in regressions:
+        print("РЕГРЕССИЯ", regression)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
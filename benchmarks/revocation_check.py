@@ -0,0 +1,69 @@
+"""Стоимость проверки отзыва токена на один аутентифицированный запрос.
+
+было:  синхронный REDIS_CLIENT.exists() прямо в event loop на каждый запрос
+стало: RevocationStore - асинхронный клиент с пулом и локальный кеш "не отозван"
+
+Нужен Redis по адресу REDIS_URL. Без него замеряется только in-memory бэкенд.
+
+Запуск: python -m benchmarks.revocation_check
+"""
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import percentile
+
+CLIENTS = 32
+CHECKS_PER_CLIENT = 500
+TOKENS = 100
+
+
+async def run(name, check, tokens):
+    latencies = []
+
+    async def client(offset):
+        for i in range(CHECKS_PER_CLIENT):
+            started = time.perf_counter()
+            await check(tokens[(offset + i) % len(tokens)])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(offset) for offset in range(CLIENTS)])
+    elapsed = time.perf_counter() - started
+    print(f"{name:<34} checks/s={len(latencies) / elapsed:9.0f} p50={percentile(latencies, 50) * 1e6:8.1f}us "
+          f"p99={percentile(latencies, 99) * 1e6:8.1f}us")
+
+
+async def main():
+    import redis
+    from users.config import ASYNC_REDIS_CLIENT, REDIS_CLIENT
+    from users.revocation import (MemoryRevocationBackend, RedisRevocationBackend, RevocationStore,
+                                  REVOCATION_NEGATIVE_TTL_SECONDS)
+
+    tokens = [uuid.uuid4().hex for _ in range(TOKENS)]
+
+    try:
+        REDIS_CLIENT.ping()
+        redis_available = True
+    except redis.exceptions.ConnectionError:
+        redis_available = False
+        print("Redis недоступен, замеряется только in-memory бэкенд")
+
+    if redis_available:
+        async def legacy(token):
+            return REDIS_CLIENT.exists(f"blacklist_{token}") > 0
+
+        await run("было: sync redis в event loop", legacy, tokens)
+        no_cache = RevocationStore(RedisRevocationBackend(ASYNC_REDIS_CLIENT), 0, 0)
+        await run("async redis без локального кеша", no_cache.is_revoked, tokens)
+        store = RevocationStore(RedisRevocationBackend(ASYNC_REDIS_CLIENT), REVOCATION_NEGATIVE_TTL_SECONDS, 100000)
+        await run("стало: async redis + локальный кеш", store.is_revoked, tokens)
+        print("обращений к Redis:", store.stats())
+        await ASYNC_REDIS_CLIENT.aclose()
+
+    store = RevocationStore(MemoryRevocationBackend(), REVOCATION_NEGATIVE_TTL_SECONDS, 100000)
+    await run("in-memory бэкенд + локальный кеш", store.is_revoked, tokens)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
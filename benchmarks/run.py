@@ -0,0 +1,103 @@
+"""Нагрузочный прогон по сценариям с отчетом в JSON.
+
+По умолчанию main.app запускается в процессе через ASGI-транспорт httpx
+(вместе с lifespan) на временной базе, которую заполняет генератор.
+Для прогона без Redis по умолчанию включается REVOCATION_BACKEND=memory.
+
+С --url запросы идут на уже запущенный сервер, его база должна быть
+заполнена заранее:
+    python -m benchmarks.generator --users 1000 --posts 100000
+    RATE_LIMIT_ENABLED=false uvicorn main:app  # иначе лимиты частоты отсекут нагрузку
+    python -m benchmarks.run --url http://127.0.0.1:8000
+
+Отчет пишется в benchmarks/results/<коммит>.json (или --output).
+С --baseline отчет сравнивается со старым, при регрессиях код возврата 1.
+Для быстрых прогонов входа можно уменьшить стоимость bcrypt: BCRYPT_ROUNDS=4.
+
+Запуск: python -m benchmarks.run [--scenarios login_storm feed_reads mixed]
+        [--duration 10] [--concurrency 16] [--users 200 --posts 20000 --categories 30 --seed 1]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from benchmarks.common import ROOT, load_app
+from benchmarks.report import Recorder, build_report, compare, format_report, git_commit, load, save
+from benchmarks.scenarios import SCENARIOS, Dataset
+
+
+async def run(args) -> dict:
+    import httpx
+
+    results = {}
+
+    async def run_scenarios(client):
+        dataset = await Dataset.discover(client)
+        for name in args.scenarios:
+            recorder = Recorder()
+            await SCENARIOS[name](client, recorder, dataset, args.duration, args.concurrency, args.seed)
+            results[name] = recorder.results()
+            print(format_report({"scenarios": {name: results[name]}}), flush=True)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            await run_scenarios(client)
+        return results
+
+    os.environ.setdefault("REVOCATION_BACKEND", "memory")
+    os.environ.setdefault("SLOW_REQUEST_SECONDS", "3600")
+    app = load_app()
+    from benchmarks.generator import generate
+    from database.base import engine
+
+    started = time.perf_counter()
+    counts = generate(engine, args.users, args.posts, args.categories, args.seed)
+    print(f"данные: {counts} за {time.perf_counter() - started:.1f}s", flush=True)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            await run_scenarios(client)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон с отчетом в JSON")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд на сценарий")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=20_000)
+    parser.add_argument("--categories", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="адрес запущенного сервера вместо прогона в процессе")
+    parser.add_argument("--output", help="путь отчета, по умолчанию benchmarks/results/<коммит>.json")
+    parser.add_argument("--baseline", help="отчет для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # load_app меняет рабочую директорию, пути нужны абсолютные
+    output = os.path.abspath(args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"{git_commit()['commit'] or 'report'}.json"))
+    baseline = load(os.path.abspath(args.baseline)) if args.baseline else None
+
+    scenarios = asyncio.run(run(args))
+    params = {key: getattr(args, key) for key in ("scenarios", "duration", "concurrency", "users", "posts", "categories", "seed")}
+    params["target"] = args.url or "asgi"
+    report = build_report(scenarios, params)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    save(report, output)
+    print(f"отчет: {output}")
+
+    if baseline is not None:
+        print(format_report(report, baseline))
+        regressions = compare(baseline, report, args.threshold)
+        for regression in regressions:
+            print("РЕГРЕССИЯ", regression)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
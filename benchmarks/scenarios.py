@@ -0,0 +1,148 @@
+"""Сценарии нагрузки для benchmarks.run.
+
+Сценарий получает httpx-клиент, Recorder и сведения о данных (Dataset),
+делает подготовку без записи в отчет, затем concurrency клиентов
+работают duration секунд. Все запросы идут через публичный API,
+поэтому сценарии одинаково работают в процессе и против uvicorn.
+"""
+import asyncio
+import random
+import time
+
+from benchmarks.generator import PASSWORD, WORDS
+from benchmarks.report import Recorder
+
+FEED_LIMIT = 20
+PAGE_LIMIT = 20
+BULK_SIZE = 10
+
+
+class Dataset:
+    """Что есть в базе: находится через API, после генератора benchmarks.generator"""
+
+    def __init__(self, usernames: list[str], post_ids: list[int], category_ids: list[int]):
+        self.usernames = usernames
+        self.post_ids = post_ids
+        self.category_ids = category_ids
+
+    @classmethod
+    async def discover(cls, client) -> "Dataset":
+        async def ids(url, key):
+            response = await client.get(url, params={"limit": 500})
+            response.raise_for_status()
+            return [item[key] for item in response.json()["items"]]
+
+        dataset = cls(await ids("/users/all_users", "username"), await ids("/posts/get", "id"),
+                      await ids("/category/get", "id"))
+        if not dataset.usernames or not dataset.post_ids:
+            raise RuntimeError("В базе нет пользователей или постов, сначала запустите python -m benchmarks.generator")
+        return dataset
+
+
+async def login(client, username: str) -> dict:
+    """Заголовок авторизации. При 503 от пула bcrypt ждет Retry-After и повторяет"""
+    while True:
+        response = await client.post("/users/login/", data={"username": username, "password": PASSWORD})
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+            continue
+        if response.status_code != 200:
+            raise RuntimeError(f"Не удалось войти как {username}: {response.status_code} {response.text}")
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def login_many(client, usernames: list[str], count: int) -> list[dict]:
+    return list(await asyncio.gather(*[login(client, usernames[i % len(usernames)]) for i in range(count)]))
+
+
+async def run_workers(recorder: Recorder, duration: float, concurrency: int, worker):
+    recorder.start()
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*[worker(index, deadline) for index in range(concurrency)])
+    recorder.stop()
+
+
+async def login_storm(client, recorder: Recorder, dataset: Dataset, duration: float, concurrency: int, seed: int):
+    """Непрерывные входы случайных пользователей. 503 - отказ пула bcrypt, клиент ждет и повторяет"""
+
+    async def worker(index, deadline):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            response = await recorder.request(client, "POST", "POST /users/login/", "/users/login/",
+                                              data={"username": rng.choice(dataset.usernames), "password": PASSWORD})
+            if response.status_code == 503:
+                await asyncio.sleep(0.01)
+
+    await run_workers(recorder, duration, concurrency, worker)
+
+
+async def feed_reads(client, recorder: Recorder, dataset: Dataset, duration: float, concurrency: int, seed: int):
+    """Каждый клиент листает свою ленту: /feed/next, свайп пачки (20% лайков),
+    открытие одного поста, иногда список популярных"""
+    auth = await login_many(client, dataset.usernames, concurrency)
+
+    async def worker(index, deadline):
+        rng = random.Random(seed + index)
+        headers = auth[index]
+        iteration = 0
+        while time.perf_counter() < deadline:
+            iteration += 1
+            response = await recorder.request(client, "GET", "GET /feed/next", "/feed/next",
+                                              params={"limit": FEED_LIMIT}, headers=headers)
+            posts = response.json() if response.status_code == 200 else []
+            if posts:
+                swipes = [{"post_id": post["id"], "action": "like" if rng.random() < 0.2 else "skip"} for post in posts]
+                await recorder.request(client, "POST", "POST /feed/swipe", "/feed/swipe", json=swipes, headers=headers)
+                await recorder.request(client, "GET", "GET /posts/get/{id}", f"/posts/get/{rng.choice(posts)['id']}")
+            if not posts or iteration % 10 == 0:
+                await recorder.request(client, "GET", "GET /posts/popular", "/posts/popular")
+
+    await run_workers(recorder, duration, concurrency, worker)
+
+
+async def mixed(client, recorder: Recorder, dataset: Dataset, duration: float, concurrency: int, seed: int):
+    """Смесь чтения и записи: ~85% чтений (списки, пост, категория, поиск), ~15% создания постов"""
+    auth = await login_many(client, dataset.usernames, concurrency)
+
+    async def worker(index, deadline):
+        rng = random.Random(seed + index)
+        headers = auth[index]
+        cursor, pages = None, 0
+        while time.perf_counter() < deadline:
+            roll = rng.random()
+            if roll < 0.35:
+                params = {"limit": PAGE_LIMIT, **({"after": cursor} if cursor else {})}
+                response = await recorder.request(client, "GET", "GET /posts/get", "/posts/get", params=params)
+                pages += 1
+                cursor = response.json().get("next_cursor") if response.status_code == 200 and pages < 5 else None
+                if cursor is None:
+                    pages = 0
+            elif roll < 0.6:
+                await recorder.request(client, "GET", "GET /posts/get/{id}", f"/posts/get/{rng.choice(dataset.post_ids)}")
+            elif roll < 0.75 and dataset.category_ids:
+                await recorder.request(client, "GET", "GET /category/{id}/posts",
+                                       f"/category/{rng.choice(dataset.category_ids)}/posts", params={"limit": PAGE_LIMIT})
+            elif roll < 0.85:
+                await recorder.request(client, "GET", "GET /posts/search", "/posts/search",
+                                       params={"q": " ".join(rng.sample(WORDS, 2)), "limit": PAGE_LIMIT})
+            elif roll < 0.97:
+                await recorder.request(client, "POST", "POST /posts/create", "/posts/create", headers=headers,
+                                       json=_post(rng, dataset))
+            else:
+                await recorder.request(client, "POST", "POST /posts/bulk", "/posts/bulk", headers=headers,
+                                       json=[_post(rng, dataset) for _ in range(BULK_SIZE)])
+
+    await run_workers(recorder, duration, concurrency, worker)
+
+
+def _post(rng: random.Random, dataset: Dataset) -> dict:
+    categories = rng.sample(dataset.category_ids, min(len(dataset.category_ids), rng.randint(0, 2)))
+    return {"title": " ".join(rng.choices(WORDS, k=3)), "content": " ".join(rng.choices(WORDS, k=20)),
+            "categories": categories}
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "feed_reads": feed_reads,
+    "mixed": mixed,
+}
@@ -0,0 +1,66 @@
+"""Сравнение поиска через FTS5 (posts_fts) и сканирования LIKE '%q%'.
+
+Запуск: python -m benchmarks.search_vs_like [число_постов]
+По умолчанию 1 000 000 постов; заполнение идет через триггеры индекса.
+"""
+import itertools
+import random
+import sys
+import time
+
+from benchmarks.common import load_app, percentile
+
+POSTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+BATCH = 10_000
+PAGE = 50
+REPEAT = 5
+SEED = 42
+
+
+def main():
+    load_app()
+
+    from sqlalchemy import text
+    from database.base import engine
+    from posts.search import SCORE, match_query
+
+    rng = random.Random(SEED)
+    # частотность слов по Ципфу: есть и частые, и редкие слова
+    vocabulary = [f"слово{i}" for i in range(20_000)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+    def sentence(words):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words))
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, username, password) VALUES (1, 'bench', '-')"))
+        for offset in range(0, POSTS, BATCH):
+            rows = [{"title": sentence(4), "content": sentence(30), "user_id": 1}
+                    for _ in range(min(BATCH, POSTS - offset))]
+            connection.execute(text("INSERT INTO posts (title, content, user_id) VALUES (:title, :content, :user_id)"), rows)
+    print(f"загружено {POSTS} постов за {time.perf_counter() - started:.1f}s")
+
+    fts = text(f"""SELECT posts_fts.rowid, {SCORE} AS score FROM posts_fts
+                   WHERE posts_fts MATCH :q ORDER BY score, posts_fts.rowid LIMIT {PAGE}""")
+    like = text(f"SELECT id FROM posts WHERE title LIKE :q OR content LIKE :q ORDER BY id LIMIT {PAGE}")
+    queries = {"частое": vocabulary[3], "среднее": vocabulary[500], "редкое": vocabulary[19_000],
+               "нет совпадений": "отсутствующее"}
+
+    with engine.connect() as connection:
+        for label, word in queries.items():
+            timings = {}
+            for name, statement, q in (("fts", fts, match_query(word)), ("like", like, f"%{word}%")):
+                samples = []
+                for _ in range(REPEAT):
+                    started = time.perf_counter()
+                    found = len(connection.execute(statement, {"q": q}).all())
+                    samples.append(time.perf_counter() - started)
+                timings[name] = (percentile(samples, 50), found)
+            (fts_time, fts_found), (like_time, like_found) = timings["fts"], timings["like"]
+            print(f"{label:<15} fts={fts_time * 1000:9.2f}ms ({fts_found:>2})  "
+                  f"like={like_time * 1000:9.2f}ms ({like_found:>2})  x{like_time / max(fts_time, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
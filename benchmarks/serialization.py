@@ -0,0 +1,71 @@
+"""Стоимость сериализации ответа из 10k постов.
+
+было:  маршрут без response_model - jsonable_encoder обходит объекты, JSONResponse (json из stdlib)
+стало: response_model - проверка и сериализация в pydantic-core, в байты переводит ORJSONResponse
+кеш:   готовое тело через model_dump_json, как в http_cache и NDJSON
+
+Посты собираются в памяти, база не нужна. Время - лучшее из ROUNDS прогонов.
+
+Запуск: python -m benchmarks.serialization [число_постов]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from typing import List
+
+from benchmarks.common import load_app
+
+POSTS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+ROUNDS = 7
+
+
+def measure(name, func):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        body = func()
+        timings.append(time.perf_counter() - started)
+    size = f"тело={len(body) / 1024:8.0f} КБ" if isinstance(body, bytes) else ""
+    print(f"{name:<44} лучшее={min(timings) * 1000:8.1f}ms медиана={statistics.median(timings) * 1000:8.1f}ms {size}")
+    return min(timings)
+
+
+def main():
+    load_app()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from pydantic import TypeAdapter
+    from category_post.catalog import CatalogSnapshot, category_catalog
+    from posts.models import Post
+    from posts.scheme import PostSummary
+    from users.models import User
+
+    category_catalog.snapshot = CatalogSnapshot.build(1, [(i, f"category{i}") for i in range(1, 6)])
+    author = User(id=1, username="author")
+    posts = [
+        Post(id=i, title=f"Пост номер {i}", content="текст поста " * 15, user_id=1, author=author,
+             category_id_list=",".join(str(category_id) for category_id in range(1, i % 4 + 1)) or None)
+        for i in range(1, POSTS + 1)
+    ]
+    items = [PostSummary.from_post(post) for post in posts]
+    field = create_model_field(name="response", type_=List[PostSummary], mode="serialization")
+    adapter = TypeAdapter(List[PostSummary])
+
+    def with_response_model():
+        content = asyncio.run(serialize_response(field=field, response_content=items))
+        return ORJSONResponse(content).body
+
+    print(f"постов: {POSTS}")
+    measure("Post -> PostSummary (from_post)", lambda: [PostSummary.from_post(post) for post in posts])
+    before = measure("было: jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(items)).body)
+    after = measure("стало: response_model + ORJSONResponse", with_response_model)
+    cached = measure("кеш: TypeAdapter.dump_json", lambda: adapter.dump_json(items))
+    print(f"response_model + orjson быстрее в {before / after:.1f} раза, dump_json - в {before / cached:.1f} раза")
+
+
+if __name__ == "__main__":
+    main()
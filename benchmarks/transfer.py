@@ -0,0 +1,101 @@
+"""Выгрузка и загрузка базы в NDJSON (transfer).
+
+выгрузка: курсор с yield_per, пик памяти Python не зависит от размера базы
+было:     загрузка через ORM - объект на строку, session.add, autoflush, коммит каждые 1000 строк
+          (на первых ORM_ROWS строках файла, чтобы не ждать)
+стало:    Importer - executemany пачками, коммит каждые IMPORT_COMMIT_ROWS строк
+          с позицией задания; отдельно - с --defer-triggers (пересчет поиска и счетчиков в конце)
+
+Каждая загрузка идет в новую пустую базу.
+
+Запуск: python -m benchmarks.transfer [число_постов]
+"""
+import itertools
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import load_app
+
+POSTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+USERS = 1000
+CATEGORIES = 50
+ORM_ROWS = 50_000
+ORM_COMMIT_ROWS = 1000
+
+
+def main():
+    load_app()
+
+    import orjson
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from benchmarks.generator import generate
+    from database.base import Base, _configure_sqlite, engine
+    from transfer.utils import (TABLES, Importer, drop_insert_triggers, export_tables, import_lines,
+                                restore_insert_triggers)
+
+    counts = generate(engine, USERS, POSTS, CATEGORIES)
+    rows = sum(counts.values())
+    path = os.path.abspath("dump.ndjson")
+
+    with engine.connect() as connection, open(path, "wb") as file:
+        started = time.perf_counter()
+        for chunk in export_tables(connection, TABLES):
+            file.write(chunk)
+        elapsed = time.perf_counter() - started
+    print(f"строк: {rows} ({counts}), файл {os.path.getsize(path) / 2 ** 20:.0f} МБ")
+    print(f"{'выгрузка':<36} {elapsed:6.1f}s {rows / elapsed:9.0f} строк/с")
+
+    tracemalloc.start()
+    with engine.connect() as connection:
+        for _ in export_tables(connection, TABLES):
+            pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{'выгрузка, пик памяти Python':<36} {peak / 2 ** 20:6.1f} МБ")
+
+    def target(name):
+        target_engine = create_engine(f"sqlite:///{os.path.abspath(name)}")
+        _configure_sqlite(target_engine)
+        Base.metadata.create_all(target_engine)
+        return target_engine
+
+    mapped = {mapper.local_table.name: mapper.class_ for mapper in Base.registry.mappers}
+    orm_engine = target("orm.db")
+    started = time.perf_counter()
+    with Session(orm_engine, autoflush=True) as session, open(path, "rb") as file:
+        for number, line in enumerate(itertools.islice(file, ORM_ROWS), 1):
+            record = orjson.loads(line)
+            if record["table"] in mapped:
+                session.add(mapped[record["table"]](**record["row"]))
+            else:
+                session.flush()
+                session.execute(TABLES[record["table"]].insert(), record["row"])
+            if number % ORM_COMMIT_ROWS == 0:
+                session.commit()
+        session.commit()
+    orm = ORM_ROWS / (time.perf_counter() - started)
+    print(f"{'было: ORM add + autoflush':<36} {ORM_ROWS / orm:6.1f}s {orm:9.0f} строк/с  ({ORM_ROWS} строк)")
+    orm_engine.dispose()
+
+    for name, defer in (("стало: Importer", False), ("стало: Importer + defer-triggers", True)):
+        bulk_engine = target(f"bulk_{defer}.db")
+        started = time.perf_counter()
+        if defer:
+            with bulk_engine.begin() as connection:
+                drop_insert_triggers(connection)
+        with Session(bulk_engine, autoflush=False) as session, open(path, "rb") as file:
+            import_lines(session, file, Importer(name))
+        if defer:
+            with bulk_engine.begin() as connection:
+                restore_insert_triggers(connection)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<36} {elapsed:6.1f}s {rows / elapsed:9.0f} строк/с  x{rows / elapsed / orm:.1f}, "
+              f"10M строк ~{10_000_000 / (rows / elapsed) / 60:.0f} мин")
+        bulk_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Удаление пользователя с большим числом постов.
+
+было:  db.delete(user) с каскадами ORM - все посты и их категории загружаются
+       и удаляются по одному в одной транзакции (повторено вручную тем же
+       порядком, что делал каскад cascade="all"); заодно удаляются общие категории
+стало: DELETE /users/delete только ставит отметку, посты вычищает Purger
+       пачками по PURGE_BATCH_SIZE в отдельных транзакциях
+
+Во время удаления писатель от другого пользователя создает посты: видно,
+как долго удаление держит блокировку записи SQLite.
+
+Запуск: python -m benchmarks.user_delete [число_постов]
+"""
+import asyncio
+import os
+import sys
+import time
+
+from benchmarks.common import load_app, summary
+
+VICTIM_POSTS = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+CATEGORIES = 20
+INSERT_BATCH = 5000
+
+
+async def main():
+    # в замере нет закешированных токенов других воркеров, ждать срок жизни кеша незачем
+    os.environ.setdefault("PURGE_USER_DELAY_SECONDS", "0")
+    app = load_app()
+
+    import httpx
+    from fastapi import Request
+    from sqlalchemy import func, insert, select
+    from sqlalchemy.orm import selectinload
+    from category_post.models import Category, category_post
+    from database.base import AsyncSessionLocal, engine
+    from posts.models import Post
+    from purge.models import deleted_users
+    from users.models import User
+    from users.utils import get_current_user
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"username": name, "password": "-"} for name in ("writer", "old", "new")])
+        connection.execute(insert(Category), [{"title": f"category{i}"} for i in range(CATEGORIES)])
+        for user_id in (2, 3):
+            for offset in range(0, VICTIM_POSTS, INSERT_BATCH):
+                size = min(INSERT_BATCH, VICTIM_POSTS - offset)
+                first = connection.scalar(select(func.coalesce(func.max(Post.id), 0))) + 1
+                connection.execute(insert(Post), [{"title": f"post {offset + i}", "content": "x" * 200, "user_id": user_id}
+                                                  for i in range(size)])
+                connection.execute(category_post.insert(), [{"post_id": first + i, "category_id": 1 + (first + i) % CATEGORIES}
+                                                            for i in range(size)])
+        # пост писателя в каждой категории: категории общие с удаляемыми пользователями
+        connection.execute(insert(Post), [{"title": "writer", "content": "w", "user_id": 1}])
+        writer_post = connection.scalar(select(func.max(Post.id)))
+        connection.execute(category_post.insert(), [{"post_id": writer_post, "category_id": 1 + i} for i in range(CATEGORIES)])
+
+    async def bench_user(request: Request):
+        async with AsyncSessionLocal() as db:
+            return await db.get(User, int(request.headers["x-bench-user"]))
+
+    # авторизация не входит в замер, пользователь берется из заголовка
+    app.dependency_overrides[get_current_user] = bench_user
+
+    async def categories_left():
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count()).select_from(Category))
+
+    async def orm_cascade_delete():
+        async with AsyncSessionLocal() as db:
+            user = await db.scalar(select(User).where(User.id == 2).options(
+                selectinload(User.posts).selectinload(Post.categories)))
+            for post in user.posts:
+                for category in post.categories:
+                    await db.delete(category)
+                await db.delete(post)
+            await db.delete(user)
+            await db.commit()
+
+    async def purged():
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count()).select_from(deleted_users)) == 0
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            async def writer(latencies, done):
+                while not done.is_set():
+                    started = time.perf_counter()
+                    await client.post("/posts/create", json={"title": "w", "content": "w", "categories": []},
+                                      headers={"x-bench-user": "1"})
+                    latencies.append(time.perf_counter() - started)
+
+            async def run(name, delete):
+                latencies, done = [], asyncio.Event()
+                task = asyncio.create_task(writer(latencies, done))
+                await asyncio.sleep(0.2)
+                started = time.perf_counter()
+                request_time = await delete()
+                while not await purged():
+                    await asyncio.sleep(0.05)
+                elapsed = time.perf_counter() - started
+                done.set()
+                await task
+                print(f"{name}: ответ {request_time * 1000:8.1f}ms, данные удалены за {elapsed:6.2f}s, "
+                      f"категорий осталось {await categories_left()} из {CATEGORIES}")
+                print("  " + summary("POST /posts/create", latencies, elapsed + 0.2) +
+                      f" max={max(latencies) * 1000:.0f}ms")
+
+            async def old():
+                started = time.perf_counter()
+                await orm_cascade_delete()
+                return time.perf_counter() - started
+
+            async def new():
+                started = time.perf_counter()
+                response = await client.delete("/users/delete", headers={"x-bench-user": "3"})
+                response.raise_for_status()
+                return time.perf_counter() - started
+
+            print(f"постов у пользователя: {VICTIM_POSTS}")
+            await run("было: каскад ORM", old)
+            async with AsyncSessionLocal() as db:  # категории вернем, чтобы второй замер был в тех же условиях
+                await db.execute(insert(Category), [{"id": i + 1, "title": f"category{i}"} for i in range(CATEGORIES)
+                                                    if await db.get(Category, i + 1) is None])
+                await db.commit()
+            await run("стало: отметка + Purger", new)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
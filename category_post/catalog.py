@@ -0,0 +1,101 @@
+"""Каталог категорий в памяти процесса: id -> название и название -> id.
+
+Категорий мало, меняются они редко, а нужны почти в каждом ответе с постами,
+поэтому названия берутся отсюда, без JOIN с categories. Снимок неизменяемый
+и заменяется целиком одним присваиванием: обработчик, который взял снимок,
+до конца работает с согласованными данными.
+
+Каждый снимок помнит версию таблицы (categories_version, ее увеличивают
+триггеры). Категории через API только добавляются, поэтому устаревший снимок
+проявляется как незнакомый id - тогда версия сверяется с базой и при
+расхождении (категорию добавил другой воркер или импорт) каталог
+перечитывается.
+"""
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Iterable, Mapping
+
+from sqlalchemy import select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import AsyncSessionLocal
+from .models import Category, categories_version
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int = -1
+    titles: Mapping[int, str] = field(default_factory=lambda: MappingProxyType({}))
+    ids: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def build(cls, version: int, rows: Iterable[tuple[int, str]]) -> "CatalogSnapshot":
+        titles = dict(rows)
+        return cls(version, MappingProxyType(titles), MappingProxyType({title: id for id, title in titles.items()}))
+
+
+class CategoryCatalog:
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.snapshot = CatalogSnapshot()
+        self.reloads = 0
+        self.version_checks = 0
+
+    async def start(self):
+        async with self.session_factory() as db:
+            await self.reload(db)
+
+    async def reload(self, db: AsyncSession) -> CatalogSnapshot:
+        """Версия и категории читаются одним запросом, так что версия соответствует содержимому"""
+        rows = (await db.execute(
+            select(categories_version.c.version, Category.id, Category.title)
+            .select_from(categories_version.outerjoin(Category, true()))
+            .where(categories_version.c.id == 1)
+        )).tuples().all()
+        self.reloads += 1
+        version = rows[0][0] if rows else 0
+        return self._swap(CatalogSnapshot.build(version, [(id, title) for _, id, title in rows if id is not None]))
+
+    async def refresh(self, db: AsyncSession) -> CatalogSnapshot:
+        """Сверяет версию с базой, перечитывает каталог только если он устарел"""
+        self.version_checks += 1
+        if await current_version(db) != self.snapshot.version:
+            return await self.reload(db)
+        return self.snapshot
+
+    async def missing(self, db: AsyncSession, ids: set[int]) -> set[int]:
+        """Какие из id категорий не существуют. База читается, только если в снимке чего-то нет"""
+        missing = ids - self.snapshot.titles.keys()
+        if missing:
+            missing = ids - (await self.refresh(db)).titles.keys()
+        return missing
+
+    async def added(self, db: AsyncSession, version: int, category_id: int, title: str):
+        """После коммита вставки категории. version - версия, прочитанная в той же транзакции:
+        если она ровно на единицу больше версии снимка, других записей не было и категория
+        добавляется в копию снимка, иначе каталог перечитывается целиком"""
+        snapshot = self.snapshot
+        if version == snapshot.version + 1:
+            self._swap(CatalogSnapshot.build(version, [*snapshot.titles.items(), (category_id, title)]))
+        else:
+            await self.reload(db)
+
+    def titles(self, ids: Iterable[int]) -> list[str]:
+        titles = self.snapshot.titles
+        return [titles[id] for id in ids if id in titles]
+
+    def stats(self) -> dict:
+        return {"size": len(self.snapshot.titles), "reloads": self.reloads, "version_checks": self.version_checks}
+
+    def _swap(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        # снимок с реплики чтения может быть старше уже загруженного - назад не откатываемся
+        if snapshot.version >= self.snapshot.version:
+            self.snapshot = snapshot
+        return self.snapshot
+
+
+async def current_version(db: AsyncSession) -> int:
+    return await db.scalar(select(categories_version.c.version).where(categories_version.c.id == 1)) or 0
+
+
+category_catalog = CategoryCatalog(AsyncSessionLocal)
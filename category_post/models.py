@@ -1,26 +1,85 @@
-from sqlalchemy import String, Integer, ForeignKey, Table, Column
-from sqlalchemy.orm import relationship, Mapped, MappedColumn
+from sqlalchemy import String, Integer, ForeignKey, Table, Column, Index, event, func, select, text
+from sqlalchemy.orm import relationship, Mapped, MappedColumn, column_property
 from database.base import engine, Base
 
 
 category_post = Table("category_post",
                       Base.metadata,
                 Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
-                      Column("category_id", Integer, ForeignKey("categories.id"), primary_key=True)
+                      Column("category_id", Integer, ForeignKey("categories.id"), primary_key=True),
+                      # обратный поиск постов по категории без полного сканирования
+                      Index("ix_category_post_category_id_post_id", "category_id", "post_id"),
                       )
 
+# число постов в категории, поддерживается триггерами на category_post
+category_stats = Table("category_stats",
+                       Base.metadata,
+                       Column("category_id", Integer, primary_key=True),
+                       Column("post_count", Integer, nullable=False, server_default="0"),
+                       )
+
+CATEGORY_STATS_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS category_stats_ai AFTER INSERT ON category_post BEGIN
+        INSERT INTO category_stats(category_id, post_count) VALUES (new.category_id, 1)
+        ON CONFLICT(category_id) DO UPDATE SET post_count = post_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS category_stats_ad AFTER DELETE ON category_post BEGIN
+        UPDATE category_stats SET post_count = post_count - 1 WHERE category_id = old.category_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS category_stats_category_ad AFTER DELETE ON categories BEGIN
+        DELETE FROM category_stats WHERE category_id = old.id;
+    END""",
+)
+
+# версия таблицы categories: триггеры увеличивают ее при любом изменении,
+# по ней каталог в памяти (category_post.catalog) замечает записи других воркеров
+categories_version = Table("categories_version",
+                           Base.metadata,
+                           Column("id", Integer, primary_key=True),
+                           Column("version", Integer, nullable=False, server_default="0"),
+                           )
+
+CATEGORIES_VERSION_TRIGGERS = tuple(
+    f"""CREATE TRIGGER IF NOT EXISTS categories_version_{suffix} AFTER {event_name} ON categories BEGIN
+        UPDATE categories_version SET version = version + 1 WHERE id = 1;
+    END"""
+    for suffix, event_name in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE"))
+)
+
 class Category(Base):
     __tablename__ = "categories"
 
     id: Mapped[int] = MappedColumn(Integer, primary_key=True)
     title: Mapped[str] = MappedColumn(String(255), unique=True)
+    post_count: Mapped[int] = column_property(
+        func.coalesce(
+            select(category_stats.c.post_count).where(category_stats.c.category_id == id).scalar_subquery(), 0
+        )
+    )
 
-    posts = relationship("Post", secondary=category_post, back_populates="categories", cascade="all")
-
-
+    posts = relationship("Post", secondary=category_post, back_populates="categories")
 
 
+def rebuild_category_stats(connection):
+    """Пересчет счетчиков по category_post целиком"""
+    connection.execute(category_stats.delete())
+    connection.execute(category_stats.insert().from_select(
+        ["category_id", "post_count"],
+        select(category_post.c.category_id, func.count()).group_by(category_post.c.category_id),
+    ))
 
 
+@event.listens_for(Base.metadata, "after_create")
+def _create_category_stats_triggers(target, connection, **kw):
+    for statement in CATEGORY_STATS_TRIGGERS:
+        connection.execute(text(statement))
+    # таблица счетчиков только что появилась на существующей базе - считаем посты один раз
+    if connection.execute(select(category_stats.c.category_id).limit(1)).first() is None:
+        rebuild_category_stats(connection)
 
 
+@event.listens_for(Base.metadata, "after_create")
+def _create_categories_version_triggers(target, connection, **kw):
+    connection.execute(text("INSERT OR IGNORE INTO categories_version(id, version) VALUES (1, 0)"))
+    for statement in CATEGORIES_VERSION_TRIGGERS:
+        connection.execute(text(statement))
@@ -1,44 +1,62 @@
-from http.client import HTTPException
+from typing import Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
 from posts.models import Post
+from posts.queries import load_categories, post_summary_query
+from posts.scheme import Message, PostSummary
+from .catalog import category_catalog, current_version
 from .models import Category, category_post
-from sqlalchemy.orm import Session
-from database.base import get_db
-from .scheme import CategoryScheme, CategoryListScheme
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.base import get_async_db, get_read_db
+from database.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, Page, keyset_page, ndjson_response
+from http_cache.utils import CATEGORIES, response_cache
+from .scheme import CategoryScheme, CategoryListScheme, CategoryOut
 from users.models import User
 from users.utils import get_current_user
 
 def register_categories_routers() -> APIRouter:
     routers = APIRouter(prefix="/category", tags=["Категории"])
 
-    @routers.get("/get", )
-    async def get_categories(db: Session = Depends(get_db)):
-        if db:
-            category = db.query(Category).all()
-            if len(category) > 0:
-                return category
-            else:
-                return {
-                    "message": "Категорий не найдено"
-                }
-        else:
-            return {"message": "Ошибка подключения к базе данных"}
-
-    @routers.post("/post")
-    async def add_category(post: CategoryScheme, db: Session = Depends(get_db)):
-        if db:
-            new_category = Category(
-                title=post.title
-            )
-            if db.query(Category).filter(Category.title == post.title).first():
-                return {
-                    "message": "Такая категория уже существует"
-                }
-            else:
-                db.add(new_category)
-                db.commit()
-                return {"message": "Категория успешно добавлена"}
+    @routers.get("/get", response_model=Page[CategoryOut])
+    async def get_categories(request: Request, limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+                             after: str | None = None, format: Literal["json", "ndjson"] = "json",
+                             db: AsyncSession = Depends(get_read_db)):
+        """Категории с числом постов постранично, format=ndjson - все потоком"""
+        if format == "ndjson":
+            return ndjson_response(select(Category), Category.id, after, CategoryOut.model_validate)
+
+        async def build():
+            return Page[CategoryOut](**await keyset_page(db, select(Category), Category.id, limit, after))
+        return await response_cache.respond(request, (CATEGORIES,), build)
+
+    @routers.get("/{id}/posts", response_model=Page[PostSummary])
+    async def get_category_posts(id: int, limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+                                 after: str | None = None, db: AsyncSession = Depends(get_read_db)):
+        """Посты категории постранично, идет по индексу (category_id, post_id)"""
+        if await category_catalog.missing(db, {id}):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Категория не найдена")
+        stmt = post_summary_query().join(category_post, category_post.c.post_id == Post.id).where(category_post.c.category_id == id)
+        return await keyset_page(db, stmt, category_post.c.post_id, limit, after, PostSummary.from_post, load_categories)
+
+    @routers.post("/post", response_model=Message)
+    async def add_category(post: CategoryScheme, db: AsyncSession = Depends(get_async_db)):
+        """Одна вставка с ON CONFLICT: два одновременных запроса с одним названием не создадут дубликат
+        и не упадут на уникальном индексе. Известное каталогу название отвечается без записи."""
+        if post.title in category_catalog.snapshot.ids:
+            return {"message": "Такая категория уже существует"}
+        category_id = await db.scalar(
+            insert(Category).values(title=post.title).on_conflict_do_nothing(index_elements=[Category.title])
+            .returning(Category.id)
+        )
+        if category_id is None:
+            return {"message": "Такая категория уже существует"}
+        version = await current_version(db)
+        await db.commit()
+        await category_catalog.added(db, version, category_id, post.title)
+        await response_cache.bump(CATEGORIES)
+        return {"message": "Категория успешно добавлена"}
 
     return routers
\ No newline at end of file
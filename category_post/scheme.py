@@ -11,6 +11,12 @@ class CategoryScheme(BaseModel):
         from_attributes = True
 
 
+class CategoryOut(CategoryScheme):
+    """Категория с числом постов"""
+    id: int
+    post_count: int = 0
+
+
 class CategoryListScheme(CategoryScheme):
     posts: List[PostCreate]
 
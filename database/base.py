@@ -1,13 +1,77 @@
-from sqlalchemy import create_engine
+from decouple import config
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
-DATABASE_URL = "sqlite:///./database.db"
 
-# создание движка
+def _async_url(url: str) -> str:
+    """sqlite:///... -> sqlite+aiosqlite:///..., для других СУБД URL задается явно"""
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+DATABASE_URL = config("DATABASE_URL", default="sqlite:///./database.db")
+ASYNC_DATABASE_URL = config("ASYNC_DATABASE_URL", default=_async_url(DATABASE_URL))
+# отдельная реплика для чтения; по умолчанию та же база через отдельный пул
+READ_DATABASE_URL = config("READ_DATABASE_URL", default=ASYNC_DATABASE_URL)
+
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_READ_POOL_SIZE = config("DB_READ_POOL_SIZE", default=10, cast=int)
+DB_READ_MAX_OVERFLOW = config("DB_READ_MAX_OVERFLOW", default=20, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=int)
+
+SQLITE_PRAGMAS = config("SQLITE_PRAGMAS", default=True, cast=bool)
+SQLITE_BUSY_TIMEOUT_MS = config("SQLITE_BUSY_TIMEOUT_MS", default=5000, cast=int)
+SQLITE_MMAP_SIZE = config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int)
+SQLITE_CACHE_SIZE_KB = config("SQLITE_CACHE_SIZE_KB", default=64 * 1024, cast=int)
+
+
+def _pool_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    # у базы в памяти SQLAlchemy выбирает пул без параметров размера
+    if make_url(url).database in (None, "", ":memory:"):
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": DB_POOL_TIMEOUT}
+
+
+def _configure_sqlite(engine, read_only: bool = False):
+    """PRAGMA при каждом новом соединении SQLite.
+    WAL позволяет читать параллельно с записью, busy_timeout - ждать блокировку вместо ошибки
+    "database is locked", synchronous=NORMAL в WAL безопасен и убирает fsync на каждый коммит."""
+    if not SQLITE_PRAGMAS or engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+# создание движка (синхронный нужен для create_all и скриптов)
 engine = create_engine(DATABASE_URL)
+_configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# асинхронные движки для обработчиков запросов, чтобы не блокировать event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW))
+_configure_sqlite(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+read_engine = create_async_engine(READ_DATABASE_URL, **_pool_options(READ_DATABASE_URL, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW))
+_configure_sqlite(read_engine.sync_engine, read_only=True)
+AsyncReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
@@ -15,6 +79,10 @@ def init_db():
     pass
     # Base.metadata.drop_all(bind=engine) #удаление таблиц
     Base.metadata.create_all(bind=engine) #создание таблиц
+    # create_all пропускает уже существующие таблицы вместе с их индексами, досоздаем новые индексы
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 def get_db():
     db = SessionLocal()
@@ -23,3 +91,12 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Асинхронная сессия на чтение и запись"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    """Сессия только для чтения: отдельный пул или реплика, для GET-маршрутов"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
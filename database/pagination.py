@@ -0,0 +1,92 @@
+import base64
+import binascii
+import json
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Sequence, TypeVar
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import AsyncReadSessionLocal
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+STREAM_BATCH_SIZE = 500
+
+T = TypeVar("T")
+Prepare = Callable[[AsyncSession, Sequence[Any]], Awaitable[Any]]
+
+
+def encode_key(key: dict) -> str:
+    """Непрозрачный курсор: base64 от ключа последней записи страницы"""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_key(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(key, dict):
+            raise ValueError(cursor)
+        return key
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный курсор.")
+
+
+def encode_cursor(last_id: int) -> str:
+    return encode_key({"id": last_id})
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    if not cursor:
+        return None
+    try:
+        return int(decode_key(cursor)["id"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный курсор.")
+
+
+def keyset(stmt: Select, id_column, after: str | None) -> Select:
+    """Условие WHERE id > курсор и сортировка по id"""
+    last_id = decode_cursor(after)
+    if last_id is not None:
+        stmt = stmt.where(id_column > last_id)
+    return stmt.order_by(id_column)
+
+
+async def keyset_page(db: AsyncSession, stmt: Select, id_column, limit: int, after: str | None,
+                      serialize: Callable[[Any], Any] = lambda row: row, prepare: Prepare | None = None) -> dict:
+    """Страница по ключу id. Берем limit + 1 строку, чтобы понять, есть ли следующая.
+    prepare(db, rows) вызывается перед serialize, если тому нужны данные сверх строк"""
+    rows = (await db.scalars(keyset(stmt, id_column, after).limit(limit + 1))).all()
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    if prepare is not None:
+        await prepare(db, rows[:limit])
+    return {"items": [serialize(row) for row in rows[:limit]], "next_cursor": next_cursor}
+
+
+def ndjson_response(stmt: Select, id_column, after: str | None, serialize: Callable[[Any], BaseModel],
+                    prepare: Prepare | None = None) -> StreamingResponse:
+    """Потоковая выдача всех строк в формате NDJSON, serialize превращает строку в модель ответа,
+    prepare - как в keyset_page, на каждую пачку из STREAM_BATCH_SIZE строк.
+    Сессия открывается внутри генератора: зависимость get_async_db закрывается до отправки тела."""
+
+    async def generate():
+        async with AsyncReadSessionLocal() as db:
+            rows = await db.stream_scalars(keyset(stmt, id_column, after).execution_options(yield_per=STREAM_BATCH_SIZE))
+            async for batch in rows.partitions():
+                if prepare is not None:
+                    await prepare(db, batch)
+                for row in batch:
+                    yield serialize(row).model_dump_json() + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+class Page(BaseModel, Generic[T]):
+    """Страница списка с курсором на следующую"""
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, Table
+
+from database.base import Base
+
+
+# просмотренные и понравившиеся посты пользователя, блоками по 65536 id (см. feed.seen)
+feed_seen = Table("feed_seen",
+                  Base.metadata,
+                  Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+                  Column("chunk", Integer, primary_key=True),
+                  Column("seen", LargeBinary, nullable=False),
+                  Column("liked", LargeBinary, nullable=False),
+                  )
+
+# сколько лайков пользователь поставил постам каждой категории, для взвешивания ленты
+feed_affinity = Table("feed_affinity",
+                      Base.metadata,
+                      Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+                      Column("category_id", Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True),
+                      Column("likes", Integer, nullable=False, server_default="0"),
+                      )
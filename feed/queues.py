@@ -0,0 +1,231 @@
+"""Очереди кандидатов для ленты.
+
+Для каждого пользователя в памяти процесса держится очередь непросмотренных
+постов. /feed/next только снимает пачку с ее начала, а пополняется очередь
+фоновой задачей, когда в ней остается меньше FEED_REFILL_THRESHOLD постов.
+
+Пополнение идет по posts двумя курсорами: вверх от head (посты, появившиеся
+после прошлого прохода) и вниз от tail (еще не пройденные старые посты).
+Каждый id проходится один раз, просмотренные отсеиваются по SeenSet, поэтому
+стоимость не зависит от длины истории свайпов. После перезапуска процесса
+проход начинается заново с новых постов.
+"""
+import asyncio
+import contextvars
+import heapq
+import logging
+import random
+import time
+import weakref
+from collections import OrderedDict, deque
+
+from decouple import config
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from category_post.models import category_post
+from database.base import AsyncReadSessionLocal
+from posts.models import Post
+from purge.utils import visible_posts
+from .models import feed_affinity, feed_seen
+from .seen import SeenSet
+
+FEED_BATCH_SIZE = config("FEED_BATCH_SIZE", default=20, cast=int)
+FEED_QUEUE_SIZE = config("FEED_QUEUE_SIZE", default=200, cast=int)
+FEED_REFILL_THRESHOLD = config("FEED_REFILL_THRESHOLD", default=60, cast=int)
+FEED_SCAN_BATCH = config("FEED_SCAN_BATCH", default=1000, cast=int)
+FEED_MAX_SCAN_PAGES = config("FEED_MAX_SCAN_PAGES", default=20, cast=int)
+FEED_AFFINITY_BOOST = config("FEED_AFFINITY_BOOST", default=4.0, cast=float)
+FEED_MAX_USERS = config("FEED_MAX_USERS", default=10000, cast=int)
+FEED_STATE_TTL_SECONDS = config("FEED_STATE_TTL_SECONDS", default=60, cast=int)
+# из скольких первых постов очереди выбирается пачка с учетом весов
+WEIGHTED_WINDOW = 4
+
+logger = logging.getLogger(__name__)
+
+
+class UserFeed:
+    """Состояние ленты одного пользователя"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.seen: SeenSet | None = None
+        self.affinity: dict[int, int] = {}
+        self.loaded_at = 0.0
+        # (id поста, id его категорий)
+        self.queue: deque[tuple[int, tuple[int, ...]]] = deque()
+        self.head: int | None = None  # наибольший пройденный id
+        self.tail: int | None = None  # наименьший пройденный id, 0 - старых постов не осталось
+        self.refill_task: asyncio.Task | None = None
+
+    def take(self, limit: int, weighted: bool, boost: float) -> list[int]:
+        """Снимает до limit постов с начала очереди.
+        С весами пачка выбирается из окна limit * WEIGHTED_WINDOW (взвешенная выборка
+        без возвращения), невыбранные посты остаются в начале очереди."""
+        size = min(len(self.queue), limit * WEIGHTED_WINDOW if weighted else limit)
+        window = [entry for entry in (self.queue.popleft() for _ in range(size)) if entry[0] not in self.seen]
+        if weighted and self.affinity:
+            total = sum(self.affinity.values())
+            keys = {
+                entry[0]: random.random() ** (1 / (1 + boost * sum(self.affinity.get(c, 0) for c in entry[1]) / total))
+                for entry in window
+            }
+            chosen = heapq.nlargest(limit, window, key=lambda entry: keys[entry[0]])
+        else:
+            chosen = window[:limit]
+        chosen_ids = {entry[0] for entry in chosen}
+        self.queue.extendleft(reversed([entry for entry in window if entry[0] not in chosen_ids]))
+        return [entry[0] for entry in chosen]
+
+
+class FeedQueues:
+    """Очереди всех пользователей процесса, LRU по FEED_MAX_USERS"""
+
+    def __init__(self, session_factory, maxsize: int, ttl: int):
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.refills = 0
+        self.scanned = 0
+        self.evictions = 0
+        self._feeds: OrderedDict[int, UserFeed] = OrderedDict()
+        self._locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    def lock(self, user_id: int) -> asyncio.Lock:
+        """Блокировка пользователя: свайпы и загрузка истории не пересекаются"""
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def next(self, user_id: int, limit: int, weighted: bool = True) -> list[int]:
+        """Id следующих непросмотренных постов. Ждет пополнения, только если очередь пуста"""
+        feed = self._feed(user_id)
+        while not feed.queue:
+            # за один проход может не найтись ни одного непросмотренного поста - идем дальше, пока курсор двигается
+            tail = feed.tail
+            await asyncio.shield(self._schedule(feed))
+            if feed.tail in (0, tail):
+                break
+        post_ids = feed.take(limit, weighted, FEED_AFFINITY_BOOST) if feed.seen is not None else []
+        if len(feed.queue) < FEED_REFILL_THRESHOLD:
+            self._schedule(feed)
+        return post_ids
+
+    def record(self, user_id: int, post_ids: list[int], liked_categories: dict[int, int]):
+        """Переносит записанные свайпы в состояние процесса, если оно есть"""
+        feed = self._feeds.get(user_id)
+        if feed is None or feed.seen is None:
+            return
+        feed.seen.add_many(post_ids)
+        for category_id, likes in liked_categories.items():
+            feed.affinity[category_id] = feed.affinity.get(category_id, 0) + likes
+
+    def forget(self, user_id: int):
+        feed = self._feeds.pop(user_id, None)
+        if feed is not None and feed.refill_task is not None:
+            feed.refill_task.cancel()
+
+    async def shutdown(self):
+        tasks = [feed.refill_task for feed in self._feeds.values() if feed.refill_task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._feeds.clear()
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._feeds),
+            "maxsize": self.maxsize,
+            "refills": self.refills,
+            "scanned": self.scanned,
+            "evictions": self.evictions,
+        }
+
+    def _feed(self, user_id: int) -> UserFeed:
+        feed = self._feeds.get(user_id)
+        if feed is None:
+            feed = self._feeds[user_id] = UserFeed(user_id)
+            while len(self._feeds) > self.maxsize:
+                self._feeds.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._feeds.move_to_end(user_id)
+        return feed
+
+    def _schedule(self, feed: UserFeed) -> asyncio.Task:
+        if feed.refill_task is None or feed.refill_task.done():
+            # пустой контекст: запросы фоновой задачи не засчитываются запросу, который ее запустил
+            feed.refill_task = asyncio.create_task(self._refill(feed), context=contextvars.Context())
+        return feed.refill_task
+
+    async def _refill(self, feed: UserFeed):
+        try:
+            async with self.session_factory() as db:
+                if feed.seen is None or time.monotonic() - feed.loaded_at > self.ttl:
+                    await self._load(db, feed)
+                pages = 0
+                while feed.head is not None and pages < FEED_MAX_SCAN_PAGES:
+                    pages += 1
+                    if await self._scan(db, feed, newer=True) < FEED_SCAN_BATCH:
+                        break
+                while feed.tail != 0 and len(feed.queue) < FEED_QUEUE_SIZE and pages < FEED_MAX_SCAN_PAGES:
+                    pages += 1
+                    await self._scan(db, feed, newer=False)
+            self.refills += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Не удалось пополнить ленту пользователя %s", feed.user_id)
+
+    async def _load(self, db: AsyncSession, feed: UserFeed):
+        """История свайпов и веса категорий из базы"""
+        async with self.lock(feed.user_id):
+            rows = (await db.execute(
+                select(feed_seen.c.chunk, feed_seen.c.seen).where(feed_seen.c.user_id == feed.user_id)
+            )).all()
+            affinity = (await db.execute(
+                select(feed_affinity.c.category_id, feed_affinity.c.likes).where(feed_affinity.c.user_id == feed.user_id)
+            )).all()
+            feed.seen = SeenSet.load(rows)
+            feed.affinity = dict(affinity)
+            feed.loaded_at = time.monotonic()
+
+    async def _scan(self, db: AsyncSession, feed: UserFeed, newer: bool) -> int:
+        """Одна страница posts от курсора. Непросмотренные посты добавляются в очередь:
+        новые в начало, старые в конец. Возвращает число пройденных строк."""
+        stmt = select(Post.id).where(Post.user_id != feed.user_id, visible_posts())
+        if newer:
+            stmt = stmt.where(Post.id > feed.head).order_by(Post.id)
+        else:
+            if feed.tail is not None:
+                stmt = stmt.where(Post.id < feed.tail)
+            stmt = stmt.order_by(Post.id.desc())
+        post_ids = list((await db.scalars(stmt.limit(FEED_SCAN_BATCH))).all())
+        self.scanned += len(post_ids)
+
+        if newer:
+            if post_ids:
+                feed.head = post_ids[-1]
+        else:
+            if feed.head is None:
+                feed.head = post_ids[0] if post_ids else 0
+            feed.tail = post_ids[-1] if len(post_ids) == FEED_SCAN_BATCH else 0
+
+        fresh = [post_id for post_id in post_ids if post_id not in feed.seen]
+        categories: dict[int, list[int]] = {}
+        if fresh:
+            rows = await db.execute(
+                select(category_post.c.post_id, category_post.c.category_id).where(category_post.c.post_id.in_(fresh))
+            )
+            for post_id, category_id in rows:
+                categories.setdefault(post_id, []).append(category_id)
+        entries = [(post_id, tuple(categories.get(post_id, ()))) for post_id in fresh]
+        if newer:
+            feed.queue.extendleft(entries)
+        else:
+            feed.queue.extend(entries)
+        return len(post_ids)
+
+
+feed_queues = FeedQueues(AsyncReadSessionLocal, FEED_MAX_USERS, FEED_STATE_TTL_SECONDS)
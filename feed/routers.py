@@ -0,0 +1,46 @@
+from typing import List
+
+from fastapi import APIRouter, Body, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import get_async_db, get_read_db
+from database.pagination import MAX_PAGE_LIMIT
+from posts.models import Post
+from posts.queries import load_categories, post_summary_query
+from posts.scheme import PostSummary
+from users.models import User
+from users.utils import get_current_user
+from .queues import FEED_BATCH_SIZE, feed_queues
+from .scheme import Swipe, SwipeResult
+from .utils import MAX_SWIPES, record_swipes
+
+
+def register_feed_routers() -> APIRouter:
+    routers = APIRouter(prefix="/feed", tags=["Лента"])
+
+    @routers.get("/next", response_model=List[PostSummary])
+    async def next_posts(limit: int = Query(FEED_BATCH_SIZE, ge=1, le=MAX_PAGE_LIMIT), weighted: bool = True,
+                         current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)):
+        """Следующая пачка непросмотренных постов из очереди пользователя.
+        weighted - чаще показывать посты из категорий, которые пользователь лайкал.
+        Пустой список - непросмотренных постов больше нет."""
+        post_ids = await feed_queues.next(current_user.id, limit, weighted)
+        if not post_ids:
+            return []
+        posts = {post.id: post for post in (await db.scalars(post_summary_query().where(Post.id.in_(post_ids)))).all()}
+        await load_categories(db, list(posts.values()))
+        return [PostSummary.from_post(posts[post_id]) for post_id in post_ids if post_id in posts]
+
+    @routers.post("/swipe", response_model=SwipeResult)
+    async def swipe(swipes: List[Swipe] = Body(..., max_length=MAX_SWIPES),
+                    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+        """Пакет свайпов: like или skip. Посты попадают в просмотренные и больше не показываются в ленте"""
+        async with feed_queues.lock(current_user.id):
+            post_ids, ignored, liked_categories = await record_swipes(db, current_user.id, swipes)
+            await db.commit()
+            feed_queues.record(current_user.id, post_ids, liked_categories)
+        actions = {swipe.post_id: swipe.action for swipe in swipes}
+        liked = sum(1 for post_id in post_ids if actions[post_id] == "like")
+        return SwipeResult(recorded=len(post_ids), liked=liked, ignored=ignored)
+
+    return routers
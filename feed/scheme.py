@@ -0,0 +1,15 @@
+from typing import List, Literal
+
+from pydantic import BaseModel
+
+
+class Swipe(BaseModel):
+    post_id: int
+    action: Literal["like", "skip"]
+
+
+class SwipeResult(BaseModel):
+    """Итог пакета свайпов: сколько записано и какие посты не найдены"""
+    recorded: int
+    liked: int
+    ignored: List[int] = []
@@ -0,0 +1,123 @@
+"""Компактное множество id постов для ленты.
+
+Id делятся на блоки по 65536: старшие биты - номер блока, внутри блока
+хранятся младшие 16 бит. Пока в блоке не больше 4096 значений, это
+отсортированный массив uint16, дальше - битовая карта на 8 КБ, которая
+уже не больше массива. Каждый блок - отдельная строка feed_seen, поэтому
+запись свайпа трогает только свои блоки и не зависит от длины истории.
+"""
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+CHUNK_BITS = 16
+LOW_MASK = (1 << CHUNK_BITS) - 1
+BITMAP_BYTES = (1 << CHUNK_BITS) // 8
+ARRAY_LIMIT = BITMAP_BYTES // 2
+
+ARRAY_TAG = b"A"
+BITMAP_TAG = b"B"
+
+
+class Chunk:
+    """Один блок: отсортированный массив младших битов или битовая карта"""
+    __slots__ = ("values", "bitmap", "size")
+
+    def __init__(self):
+        self.values = array("H")
+        self.bitmap: bytearray | None = None
+        self.size = 0
+
+    def __contains__(self, low: int) -> bool:
+        if self.bitmap is not None:
+            return bool(self.bitmap[low >> 3] & (1 << (low & 7)))
+        index = bisect_left(self.values, low)
+        return index < len(self.values) and self.values[index] == low
+
+    def add_many(self, lows: Iterable[int]) -> int:
+        """Добавляет значения, возвращает число новых"""
+        if self.bitmap is None:
+            merged = sorted(set(self.values).union(lows))
+            if len(merged) <= ARRAY_LIMIT:
+                added = len(merged) - self.size
+                self.values = array("H", merged)
+                self.size = len(merged)
+                return added
+            lows, previous = merged, self.size
+            self._to_bitmap()
+        else:
+            previous = self.size
+        bitmap = self.bitmap
+        for low in lows:
+            bitmap[low >> 3] |= 1 << (low & 7)
+        self.size = _popcount(bitmap)
+        return self.size - previous
+
+    def dump(self) -> bytes:
+        if self.bitmap is not None:
+            return BITMAP_TAG + bytes(self.bitmap)
+        values = self.values
+        if sys.byteorder != "little":
+            values = array("H", values)
+            values.byteswap()
+        return ARRAY_TAG + values.tobytes()
+
+    @classmethod
+    def load(cls, data: bytes) -> "Chunk":
+        chunk = cls()
+        if data[:1] == BITMAP_TAG:
+            chunk.bitmap = bytearray(data[1:])
+            chunk.size = _popcount(chunk.bitmap)
+        else:
+            chunk.values.frombytes(data[1:])
+            if sys.byteorder != "little":
+                chunk.values.byteswap()
+            chunk.size = len(chunk.values)
+        return chunk
+
+    def _to_bitmap(self):
+        self.bitmap = bytearray(BITMAP_BYTES)
+        self.values = array("H")
+
+
+def _popcount(bitmap: bytearray) -> int:
+    return int.from_bytes(bitmap, "little").bit_count()
+
+
+class SeenSet:
+    """Множество id постов из блоков Chunk"""
+
+    def __init__(self, chunks: dict[int, Chunk] | None = None):
+        self.chunks = chunks if chunks is not None else {}
+
+    @classmethod
+    def load(cls, rows: Iterable[tuple[int, bytes]]) -> "SeenSet":
+        """Из строк (номер блока, данные)"""
+        return cls({number: Chunk.load(data) for number, data in rows})
+
+    def __contains__(self, post_id: int) -> bool:
+        chunk = self.chunks.get(post_id >> CHUNK_BITS)
+        return chunk is not None and (post_id & LOW_MASK) in chunk
+
+    def __len__(self) -> int:
+        return sum(chunk.size for chunk in self.chunks.values())
+
+    def add_many(self, post_ids: Iterable[int]) -> set[int]:
+        """Добавляет id, возвращает номера блоков, которые изменились"""
+        by_chunk: dict[int, list[int]] = {}
+        for post_id in post_ids:
+            by_chunk.setdefault(post_id >> CHUNK_BITS, []).append(post_id & LOW_MASK)
+        changed = set()
+        for number, lows in by_chunk.items():
+            if self.chunks.setdefault(number, Chunk()).add_many(lows):
+                changed.add(number)
+        return changed
+
+    def dump(self, number: int) -> bytes:
+        chunk = self.chunks.get(number)
+        return chunk.dump() if chunk is not None else Chunk().dump()
+
+
+def chunk_numbers(post_ids: Iterable[int]) -> set[int]:
+    return {post_id >> CHUNK_BITS for post_id in post_ids}
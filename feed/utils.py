@@ -0,0 +1,67 @@
+from decouple import config
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from category_post.models import category_post
+from posts.utils import BULK_CHUNK_SIZE, chunks, existing_post_ids
+from .models import feed_affinity, feed_seen
+from .scheme import Swipe
+from .seen import Chunk, SeenSet, chunk_numbers
+
+MAX_SWIPES = config("MAX_SWIPES", default=1000, cast=int)
+
+
+async def record_swipes(db: AsyncSession, user_id: int, swipes: list[Swipe]) -> tuple[list[int], list[int], dict[int, int]]:
+    """Записывает пакет свайпов. Читаются и перезаписываются только затронутые блоки
+    feed_seen, веса категорий увеличиваются по новым лайкам.
+    Возвращает (записанные id, ненайденные id, прибавка лайков по категориям).
+    Коммит остается за вызывающим, вызывать под feed_queues.lock(user_id)."""
+    actions = {swipe.post_id: swipe.action for swipe in swipes}
+    existing = await existing_post_ids(db, set(actions))
+    ignored = sorted(set(actions) - existing)
+    post_ids = sorted(existing)
+    if not post_ids:
+        return [], ignored, {}
+
+    numbers = sorted(chunk_numbers(post_ids))
+    rows = (await db.execute(
+        select(feed_seen.c.chunk, feed_seen.c.seen, feed_seen.c.liked)
+        .where(feed_seen.c.user_id == user_id, feed_seen.c.chunk.in_(numbers))
+    )).all()
+    seen = SeenSet({row.chunk: Chunk.load(row.seen) for row in rows})
+    liked = SeenSet({row.chunk: Chunk.load(row.liked) for row in rows})
+
+    new_likes = [post_id for post_id in post_ids if actions[post_id] == "like" and post_id not in liked]
+    changed = seen.add_many(post_ids) | liked.add_many(new_likes)
+    if changed:
+        stmt = insert(feed_seen)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[feed_seen.c.user_id, feed_seen.c.chunk],
+                set_={"seen": stmt.excluded.seen, "liked": stmt.excluded.liked},
+            ),
+            [{"user_id": user_id, "chunk": number, "seen": seen.dump(number), "liked": liked.dump(number)}
+             for number in sorted(changed)],
+        )
+
+    liked_categories = {}
+    for chunk in chunks(new_likes, BULK_CHUNK_SIZE):
+        rows = await db.execute(
+            select(category_post.c.category_id, func.count())
+            .where(category_post.c.post_id.in_(chunk))
+            .group_by(category_post.c.category_id)
+        )
+        for category_id, likes in rows:
+            liked_categories[category_id] = liked_categories.get(category_id, 0) + likes
+    if liked_categories:
+        stmt = insert(feed_affinity)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[feed_affinity.c.user_id, feed_affinity.c.category_id],
+                set_={"likes": feed_affinity.c.likes + stmt.excluded.likes},
+            ),
+            [{"user_id": user_id, "category_id": category_id, "likes": likes}
+             for category_id, likes in liked_categories.items()],
+        )
+    return post_ids, ignored, liked_categories
@@ -0,0 +1,78 @@
+"""Хранилища кеша ответов.
+
+MemoryCacheBackend (по умолчанию) согласован только в пределах одного
+процесса: версии ресурсов увеличивает лишь bump() этого воркера. Записи
+других воркеров и скриптов (python -m transfer import, benchmarks.generator)
+он не видит и отдает старые ответы, пока запись не истечет через ttl
+(HTTP_CACHE_TTL_SECONDS). Для нескольких воркеров - RedisCacheBackend.
+"""
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+
+class MemoryCacheBackend:
+    """LRU в памяти процесса со сроком жизни записей. Версии ресурсов видны только этому воркеру"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, str, bytes]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+
+    async def get(self, key: str) -> tuple[str, bytes] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, etag, body = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return etag, body
+
+    async def set(self, key: str, etag: str, body: bytes, ttl: int):
+        # версии в ключе сбрасывают кеш после записей этого воркера, ttl ограничивает
+        # устаревание после записей других процессов, как setex в RedisCacheBackend
+        self._entries[key] = (time.monotonic() + ttl, etag, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def versions(self, resources: tuple[str, ...]) -> tuple[int, ...]:
+        return tuple(self._versions.get(resource, 0) for resource in resources)
+
+    async def bump(self, resources: tuple[str, ...]):
+        for resource in resources:
+            self._versions[resource] = self._versions.get(resource, 0) + 1
+
+
+class RedisCacheBackend:
+    """Общий для всех воркеров кеш в Redis. Синхронный клиент вызывается в пуле потоков"""
+
+    prefix = "http_cache:"
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> tuple[str, bytes] | None:
+        raw = await run_in_threadpool(self.client.get, self.prefix + key)
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        return etag.decode(), body
+
+    async def set(self, key: str, etag: str, body: bytes, ttl: int):
+        await run_in_threadpool(self.client.setex, self.prefix + key, ttl, etag.encode() + b"\n" + body)
+
+    async def versions(self, resources: tuple[str, ...]) -> tuple[int, ...]:
+        values = await run_in_threadpool(self.client.mget, [f"{self.prefix}version:{resource}" for resource in resources])
+        return tuple(int(value or 0) for value in values)
+
+    async def bump(self, resources: tuple[str, ...]):
+        def incr():
+            pipe = self.client.pipeline()
+            for resource in resources:
+                pipe.incr(f"{self.prefix}version:{resource}")
+            pipe.execute()
+        await run_in_threadpool(incr)
@@ -0,0 +1,75 @@
+import hashlib
+from typing import Awaitable, Callable
+
+from decouple import config
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from .backends import MemoryCacheBackend, RedisCacheBackend
+
+
+HTTP_CACHE_BACKEND = config("HTTP_CACHE_BACKEND", default="memory") # memory или redis
+HTTP_CACHE_SIZE = config("HTTP_CACHE_SIZE", default=1024, cast=int)
+HTTP_CACHE_TTL_SECONDS = config("HTTP_CACHE_TTL_SECONDS", default=300, cast=int)
+
+# ресурсы, от которых зависят закешированные ответы
+POSTS = "posts"
+CATEGORIES = "categories"
+
+
+class ResponseCache:
+    """Кеш готовых JSON-ответов с ETag.
+    Ключ записи включает версии ресурсов, поэтому запись становится недоступной
+    сразу после bump() - отдельная инвалидация по ключам не нужна."""
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def respond(self, request: Request, resources: tuple[str, ...],
+                      build: Callable[[], Awaitable[BaseModel]]) -> Response:
+        """Отдает ответ из кеша или строит его через build().
+        Если клиент прислал совпадающий If-None-Match, тело не отправляется (304)."""
+        versions = await self.backend.versions(resources)
+        key = f"{request.url.path}?{sorted(request.query_params.multi_items())}|{versions}"
+        entry = await self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            body = (await build()).model_dump_json().encode()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            await self.backend.set(key, etag, body, self.ttl)
+        else:
+            self.hits += 1
+            etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = _parse_if_none_match(request.headers.get("if-none-match"))
+        if etag in if_none_match or "*" in if_none_match:
+            self.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def bump(self, *resources: str):
+        """Вызывается после записи: старые ответы по этим ресурсам больше не отдаются"""
+        await self.backend.bump(resources)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
+
+
+def _parse_if_none_match(value: str | None) -> set[str]:
+    if not value:
+        return set()
+    return {tag.strip() for tag in value.split(",")}
+
+
+def _create_backend():
+    if HTTP_CACHE_BACKEND == "redis":
+        from users.config import REDIS_CLIENT
+        return RedisCacheBackend(REDIS_CLIENT)
+    return MemoryCacheBackend(HTTP_CACHE_SIZE)
+
+
+response_cache = ResponseCache(_create_backend(), HTTP_CACHE_TTL_SECONDS)
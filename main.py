@@ -1,16 +1,57 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import ORJSONResponse
 
+from category_post.catalog import category_catalog
 from category_post.routers import register_categories_routers
-from database.base import init_db
+from database.base import async_engine, init_db, read_engine
+from feed.queues import feed_queues
+from feed.routers import register_feed_routers
+from monitoring.middleware import MetricsMiddleware, instrument_engine
+from monitoring.routers import register_metrics_routers
 from posts.routers import register_posts_routers
+from posts.views import view_counter
+from purge.jobs import purger
+from ratelimit.middleware import RateLimitMiddleware
+from ratelimit.utils import RATE_LIMIT_ENABLED
+from transfer.routers import register_transfer_routers
+from users.config import ASYNC_REDIS_CLIENT
+from users.hashing import password_hasher
 from users.routers import register_users_routers
 
 init_db()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await category_catalog.start()
+    await view_counter.start()
+    await purger.start()
+    yield
+    await purger.shutdown()
+    await view_counter.shutdown()
+    await feed_queues.shutdown()
+    password_hasher.shutdown()
+    await ASYNC_REDIS_CLIENT.aclose()
+    await async_engine.dispose()
+    await read_engine.dispose()
+
+
+# ответы с response_model сериализует pydantic-core, а в байты их переводит orjson
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# метрики снаружи ограничения частоты, чтобы ответы 429 тоже попадали в счетчики
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(async_engine.sync_engine)
+instrument_engine(read_engine.sync_engine)
 
 
 app.include_router(register_users_routers())
 app.include_router(register_posts_routers())
 app.include_router(register_categories_routers())
+app.include_router(register_feed_routers())
+app.include_router(register_transfer_routers())
+app.include_router(register_metrics_routers())
 
@@ -0,0 +1,136 @@
+"""Метрики в формате Prometheus без внешних зависимостей.
+
+Значения меняются только из event loop (и из потоков SQLAlchemy через
+GIL-атомарные операции над числами), поэтому блокировки не используются.
+"""
+import bisect
+from typing import Callable
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, *labels, value: float):
+        """Для значений, которые накапливает сам источник (кеши, пулы)"""
+        self.values[labels] = value
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # по меткам: [счетчики по корзинам + переполнение, сумма]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labelnames, labels, f'le="{bound}"'), cumulative
+            cumulative += counts[-1]
+            yield f"{self.name}_bucket", _labels(self.labelnames, labels, 'le="+Inf"'), cumulative
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Функция, обновляющая gauge-метрики прямо перед выдачей /metrics"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Число HTTP-запросов по маршруту и коду ответа.", ("method", "route", "status")))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса.", ("method", "route")))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Запросы, которые обрабатываются прямо сейчас."))
+REQUEST_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "Число SQL-запросов на один HTTP-запрос.", ("method", "route"), QUERY_COUNT_BUCKETS))
+REQUEST_SQL_SECONDS = REGISTRY.register(Histogram(
+    "http_request_db_seconds", "Суммарное время SQL на один HTTP-запрос.", ("method", "route")))
+CACHE_EVENTS = REGISTRY.register(Counter(
+    "app_cache_events_total", "Попадания и промахи внутренних кешей.", ("cache", "event")))
+CACHE_SIZE = REGISTRY.register(Gauge(
+    "app_cache_entries", "Число записей во внутренних кешах.", ("cache",)))
+HASH_POOL = REGISTRY.register(Gauge(
+    "password_hash_pool_tasks", "Задачи в пуле bcrypt: в работе и в очереди.", ()))
+HASH_POOL_REJECTED = REGISTRY.register(Counter(
+    "password_hash_pool_rejected_total", "Запросы, отклоненные из-за переполнения пула bcrypt."))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "http_rate_limited_total", "Запросы, отклоненные ограничением частоты (429).", ("rule",)))
+RATE_LIMIT_FALLBACKS = REGISTRY.register(Counter(
+    "rate_limit_memory_fallback_total", "Проверки лимита в памяти из-за недоступного Redis."))
+PURGED = REGISTRY.register(Counter(
+    "app_purged_total", "Удаленные пользователи и посты, вычищенные фоновой задачей.", ("table",)))
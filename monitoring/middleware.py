@@ -0,0 +1,96 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from decouple import config
+from sqlalchemy import Engine, event
+
+from .metrics import IN_FLIGHT, REQUESTS, REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_SQL_SECONDS
+
+SLOW_REQUEST_SECONDS = config("SLOW_REQUEST_SECONDS", default=0.5, cast=float)
+SLOW_REQUEST_TOP_QUERIES = 5
+MAX_TRACKED_QUERIES = 200
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestStats:
+    """SQL, выполненный в рамках одного HTTP-запроса"""
+    queries: int = 0
+    sql_seconds: float = 0.0
+    statements: list = field(default_factory=list)
+
+
+# объект изменяемый: контекст копируется в задачи и гринлеты SQLAlchemy, а счетчики общие
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def instrument_engine(engine: Engine):
+    """Подписывается на события движка и относит каждый SQL-запрос к текущему HTTP-запросу.
+    Для асинхронного движка передается async_engine.sync_engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = current_request.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        if len(stats.statements) < MAX_TRACKED_QUERIES:
+            stats.statements.append((elapsed, statement))
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: задержка, коды ответов, запросы в работе и SQL по каждому маршруту"""
+
+    def __init__(self, app, slow_request_seconds: float = SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            current_request.reset(token)
+            # шаблон маршрута, а не фактический путь: иначе число серий растет с каждым id
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUESTS.inc(method, path, status_code)
+            REQUEST_LATENCY.observe(elapsed, method, path)
+            REQUEST_QUERIES.observe(stats.queries, method, path)
+            REQUEST_SQL_SECONDS.observe(stats.sql_seconds, method, path)
+            if elapsed >= self.slow_request_seconds:
+                self._log_slow(method, scope.get("path", path), status_code, elapsed, stats)
+
+    def _log_slow(self, method, path, status_code, elapsed, stats):
+        slowest = sorted(stats.statements, key=lambda item: item[0], reverse=True)[:SLOW_REQUEST_TOP_QUERIES]
+        breakdown = "".join(f"\n    {seconds * 1000:8.2f}ms  {' '.join(statement.split())[:200]}"
+                            for seconds, statement in slowest)
+        logger.warning("Медленный запрос %s %s -> %s за %.3fs, SQL: запросов %d, время %.3fs%s",
+                       method, path, status_code, elapsed, stats.queries, stats.sql_seconds, breakdown)
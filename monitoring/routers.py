@@ -0,0 +1,65 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from category_post.catalog import category_catalog
+from feed.queues import feed_queues
+from http_cache.utils import response_cache
+from posts.views import view_counter
+from purge.jobs import purger
+from ratelimit.utils import rate_limiter
+from users.cache import principal_cache
+from users.hashing import password_hasher
+from users.revocation import revocation_store
+from .metrics import (CACHE_EVENTS, CACHE_SIZE, HASH_POOL, HASH_POOL_REJECTED, PURGED, RATE_LIMIT_FALLBACKS,
+                      RATE_LIMITED, REGISTRY)
+
+
+def collect_app_stats():
+    """Счетчики кешей, каталога категорий, очередей ленты, просмотров, пула bcrypt, лимитов и очистки копируются в реестр перед выдачей"""
+    principal = principal_cache.stats()
+    CACHE_EVENTS.set("principal", "hit", value=principal["hits"])
+    CACHE_EVENTS.set("principal", "miss", value=principal["misses"])
+    CACHE_EVENTS.set("principal", "eviction", value=principal["evictions"])
+    CACHE_SIZE.set("principal", value=principal["size"])
+    responses = response_cache.stats()
+    CACHE_EVENTS.set("response", "hit", value=responses["hits"])
+    CACHE_EVENTS.set("response", "miss", value=responses["misses"])
+    CACHE_EVENTS.set("response", "not_modified", value=responses["not_modified"])
+    revocation = revocation_store.stats()
+    CACHE_EVENTS.set("revocation", "local_hit", value=revocation["local_hits"])
+    CACHE_EVENTS.set("revocation", "backend_check", value=revocation["backend_checks"])
+    feed = feed_queues.stats()
+    CACHE_EVENTS.set("feed", "refill", value=feed["refills"])
+    CACHE_EVENTS.set("feed", "eviction", value=feed["evictions"])
+    CACHE_SIZE.set("feed", value=feed["users"])
+    views = view_counter.stats()
+    CACHE_EVENTS.set("views", "flush", value=views["flushes"])
+    CACHE_SIZE.set("views", value=views["pending"])
+    HASH_POOL.set(value=password_hasher.pending)
+    HASH_POOL_REJECTED.set(value=password_hasher.rejected)
+    limits = rate_limiter.stats()
+    for rule, count in limits["limited"].items():
+        RATE_LIMITED.set(rule, value=count)
+    RATE_LIMIT_FALLBACKS.set(value=limits["fallbacks"])
+    catalog = category_catalog.stats()
+    CACHE_EVENTS.set("category_catalog", "reload", value=catalog["reloads"])
+    CACHE_EVENTS.set("category_catalog", "version_check", value=catalog["version_checks"])
+    CACHE_SIZE.set("category_catalog", value=catalog["size"])
+    purge = purger.stats()
+    PURGED.set("users", value=purge["purged_users"])
+    PURGED.set("posts", value=purge["purged_posts"])
+    CACHE_SIZE.set("ratelimit", value=limits["memory_buckets"])
+
+
+REGISTRY.add_collector(collect_app_stats)
+
+
+def register_metrics_routers() -> APIRouter:
+    routers = APIRouter(tags=["Мониторинг"])
+
+    @routers.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Метрики в текстовом формате Prometheus"""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return routers
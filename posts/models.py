@@ -1,7 +1,9 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey
+from typing import List
 
-from category_post.models import Category
+from sqlalchemy.orm import Mapped, mapped_column, relationship, column_property
+from sqlalchemy import Column, String, Integer, ForeignKey, Table, func, select
+
+from category_post.models import Category, category_post
 from database.base import Base
 
 
@@ -12,12 +14,25 @@ class Post(Base):
     id : Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(50))
     content: Mapped[str] = mapped_column(String(255))
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), index=True)
     author: Mapped['User'] = relationship(back_populates="posts")
-    categories: Mapped['Category'] = relationship(Category, secondary='category_post', back_populates='posts', cascade='all')
-
-
-
-
-
-
+    categories: Mapped[List['Category']] = relationship(Category, secondary='category_post', back_populates='posts')
+    # id категорий через запятую, подзапрос идет по первичному ключу category_post;
+    # загружается только явно (post_summary_query), названия дает category_post.catalog
+    category_id_list: Mapped[str | None] = column_property(
+        select(func.group_concat(category_post.c.category_id)).where(category_post.c.post_id == id)
+        .correlate_except(category_post).scalar_subquery(),
+        deferred=True,
+    )
+
+    @property
+    def category_ids(self) -> list[int]:
+        return [int(category_id) for category_id in self.category_id_list.split(",")] if self.category_id_list else []
+
+
+# просмотры постов, пишутся пачками из posts.views.ViewCounter
+post_views = Table("post_views",
+                   Base.metadata,
+                   Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
+                   Column("views", Integer, nullable=False, server_default="0", index=True),
+                   )
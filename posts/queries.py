@@ -0,0 +1,28 @@
+from typing import Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only
+
+from category_post.catalog import category_catalog
+from purge.utils import visible_posts
+from users.models import User
+from .models import Post
+
+
+def post_summary_query() -> Select:
+    """Посты с автором и категориями одним запросом: автор подтягивается JOIN-ом,
+    id категорий - подзапросом по category_post, названия потом берутся из каталога.
+    Загружаются только колонки, нужные для PostSummary. Удаленные посты и посты
+    удаленных пользователей не попадают в выборку."""
+    return select(Post).options(
+        load_only(Post.id, Post.title, Post.content, Post.user_id, Post.category_id_list),
+        # внутреннее соединение: пост без автора (пользователь уже вычищен) в выдачу не попадает
+        joinedload(Post.author, innerjoin=True).load_only(User.username),
+    ).where(visible_posts())
+
+
+async def load_categories(db: AsyncSession, posts: Sequence[Post]):
+    """Перед PostSummary.from_post: если у постов есть категории, которых нет в каталоге
+    (их добавил другой воркер), каталог сверяется с базой. Обычно запросов нет."""
+    await category_catalog.missing(db, {category_id for post in posts for category_id in post.category_ids})
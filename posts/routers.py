@@ -1,78 +1,155 @@
-from http.client import HTTPException
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
 
-from category_post.models import Category, category_post
 from . models import Post
-from sqlalchemy.orm import Session
-from database.base import get_db
-from .scheme import PostCreate, PostListScheme
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.base import get_async_db, get_read_db
+from database.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, Page, keyset_page, ndjson_response
+from http_cache.utils import CATEGORIES, POSTS, response_cache
+from .queries import load_categories, post_summary_query
+from .scheme import BulkPostResult, Message, PopularPost, PostCreate, PostListScheme, PostSearchResult, PostSummary
+from .search import search_posts
+from .utils import MAX_BULK_POSTS, MISSING_CONTENT, existing_category_ids, insert_posts
+from .views import POPULAR_TOP_K, view_counter
+from purge.jobs import purger
+from purge.utils import mark_post_deleted, visible_posts
 from users.models import User
 from users.routers import get_current_user
 
 
-
 def register_posts_routers() -> APIRouter:
     routers = APIRouter(prefix="/posts", tags=["Посты"])
 
-    @routers.get("/get")
-    async def get_posts(db: Session = Depends(get_db)):
-        """Получение всех постов, смотреть могут все пользователи"""
-        if len(db.query(Post).all()) <= 0:
-            return {"Message": "Постов нет"}
-        else:
-            all_posts = db.query(Post).all()
-            return all_posts
-
-    @routers.get("/get/{id}")
-    async def get_post(id: int, db: Session = Depends(get_db)):
+    @routers.get("/get", response_model=Page[PostSummary])
+    async def get_posts(request: Request, limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+                        after: str | None = None, user_id: int | None = None, format: Literal["json", "ndjson"] = "json",
+                        db: AsyncSession = Depends(get_read_db)):
+        """Получение постов постранично (курсор по id), смотреть могут все пользователи.
+        user_id - только посты автора, format=ndjson отдает все посты после курсора одним потоком."""
+        stmt = post_summary_query()
+        if user_id is not None:
+            stmt = stmt.where(Post.user_id == user_id)
+        if format == "ndjson":
+            return ndjson_response(stmt, Post.id, after, PostSummary.from_post, load_categories)
+
+        async def build():
+            return Page[PostSummary](**await keyset_page(db, stmt, Post.id, limit, after, PostSummary.from_post,
+                                                         load_categories))
+        return await response_cache.respond(request, (POSTS,), build)
+
+    @routers.get("/search", response_model=Page[PostSearchResult])
+    async def search(q: str = Query(..., min_length=1, max_length=200),
+                     limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT), after: str | None = None,
+                     db: AsyncSession = Depends(get_read_db)):
+        """Полнотекстовый поиск по заголовку и тексту постов, лучшие совпадения первыми"""
+        if not q.strip():
+            return {"items": [], "next_cursor": None}
+        hits, next_cursor = await search_posts(db, q, limit, after)
+        ids = [hit.id for hit in hits]
+        posts = {post.id: post for post in (await db.scalars(post_summary_query().where(Post.id.in_(ids)))).all()}
+        await load_categories(db, list(posts.values()))
+        items = [
+            PostSearchResult(**PostSummary.from_post(posts[hit.id]).model_dump(), score=hit.score, snippet=hit.snippet)
+            for hit in hits if hit.id in posts
+        ]
+        return {"items": items, "next_cursor": next_cursor}
+
+    @routers.get("/get/{id}", response_model=PostSummary)
+    async def get_post(request: Request, id: int, db: AsyncSession = Depends(get_read_db)):
         """Получение поста по id, смотреть могут все пользователи"""
-        if len(db.query(Post).filter(Post.id == id).all()) <= 0:
-            return {"Message": "Поста нет"}
-        else:
-            post = db.query(Post).filter(Post.id == id).first()
-            return post
-
-
-    @routers.post("/create")
-    async def create_post(post: PostListScheme, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+        async def build():
+            post = await db.scalar(post_summary_query().where(Post.id == id))
+            if post is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Поста нет")
+            await load_categories(db, [post])
+            return PostSummary.from_post(post)
+        response = await response_cache.respond(request, (POSTS,), build)
+        view_counter.hit(id)
+        return response
+
+    @routers.get("/popular", response_model=List[PopularPost])
+    async def popular_posts(limit: int = Query(min(DEFAULT_PAGE_LIMIT, POPULAR_TOP_K), ge=1, le=POPULAR_TOP_K),
+                            db: AsyncSession = Depends(get_read_db)):
+        """Самые просматриваемые посты. Порядок берется из топа в памяти, сортировки таблицы нет;
+        к записанным просмотрам добавляются еще не записанные"""
+        ranking = view_counter.top.ranking()[:limit]
+        ids = [post_id for post_id, _ in ranking]
+        posts = {post.id: post for post in (await db.scalars(post_summary_query().where(Post.id.in_(ids)))).all()}
+        await load_categories(db, list(posts.values()))
+        return [
+            PopularPost(**PostSummary.from_post(posts[post_id]).model_dump(), views=views + view_counter.pending.get(post_id, 0))
+            for post_id, views in ranking if post_id in posts
+        ]
+
+
+    @routers.post("/create", response_model=Message)
+    async def create_post(post: PostListScheme, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
         if current_user:
-            new_post = Post(
-                title=post.title,
-                content=post.content,
-                user_id=current_user.id
-            )
-            db.add(new_post)
-            db.flush()
-
-            for category in post.categories:
-                association = category_post.insert().values(post_id=new_post.id, category_id=category)
-                db.execute(association)
-
-
-            db.commit()
+            if post.content is None:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=MISSING_CONTENT)
+            categories = set(post.categories or [])
+            missing = categories - await existing_category_ids(db, categories)
+            if missing:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Категории не найдены: {sorted(missing)}")
+            await insert_posts(db, current_user.id, [post])
+            await db.commit()
+            await response_cache.bump(POSTS, CATEGORIES)
             return {"message": "Пост создан"}
 
 
 
 
 
-    @routers.put("/update")
-    async def update_post(id: int, post: PostCreate, db: Session = Depends(get_db)):
-        post_to_update = db.query(Post).filter(Post.id == id).first()
+    @routers.post("/bulk", response_model=List[BulkPostResult])
+    async def create_posts_bulk(posts: List[PostCreate] = Body(..., max_length=MAX_BULK_POSTS),
+                                current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+        """Пакетное создание постов в одной транзакции.
+        Посты без текста или с несуществующими категориями пропускаются, результат возвращается по каждому элементу."""
+        existing = await existing_category_ids(db, {category for post in posts for category in post.categories or []})
+        results, valid = [], []
+        for index, post in enumerate(posts):
+            missing = set(post.categories or []) - existing
+            if post.content is None:
+                # один такой пост уронил бы вставку всей пачки
+                results.append(BulkPostResult(index=index, created=False, detail=MISSING_CONTENT))
+            elif missing:
+                results.append(BulkPostResult(index=index, created=False, detail=f"Категории не найдены: {sorted(missing)}"))
+            else:
+                result = BulkPostResult(index=index, created=True)
+                results.append(result)
+                valid.append((result, post))
+        post_ids = await insert_posts(db, current_user.id, [post for _, post in valid])
+        await db.commit()
+        for (result, _), post_id in zip(valid, post_ids):
+            result.id = post_id
+        if valid:
+            await response_cache.bump(POSTS, CATEGORIES)
+        return results
+
+
+    @routers.put("/update", response_model=Message)
+    async def update_post(id: int, post: PostCreate, db: AsyncSession = Depends(get_async_db)):
+        post_to_update = await db.scalar(select(Post).where(Post.id == id, visible_posts()))
         if post_to_update:
             post_to_update.title = post.title
             post_to_update.content = post.content
-            db.commit()
+            await db.commit()
+            await response_cache.bump(POSTS)
         return {"message": "Пост обновлен"}
 
 
-    @routers.delete("/delete")
-    async def delete_post(id: int, db: Session = Depends(get_db)):
-        post = db.query(Post).filter(Post.id == id).first()
-        if post:
-            db.delete(post)
-            db.commit()
+    @routers.delete("/delete", response_model=Message)
+    async def delete_post(id: int, db: AsyncSession = Depends(get_async_db)):
+        """Пост сразу скрывается, вместе со связями с категориями его вычищает purge.jobs.Purger"""
+        post_id = await db.scalar(select(Post.id).where(Post.id == id, visible_posts()))
+        if post_id is not None:
+            await mark_post_deleted(db, post_id)
+            await db.commit()
+            view_counter.forget(id)
+            await response_cache.bump(POSTS)
+            purger.wake()
         return {"message": "Пост удален"}
 
 
@@ -1,6 +1,8 @@
 from typing import Optional, List
 from pydantic import BaseModel, Field
 
+from category_post.catalog import category_catalog
+
 
 
 class PostCreate(BaseModel):
@@ -12,3 +14,44 @@ class PostListScheme(PostCreate):
     # categories: List["CategoryScheme"]
     pass
 
+
+class Message(BaseModel):
+    message: str
+
+
+class PostSummary(BaseModel):
+    """Пост для ответа: автор и категории уже развернуты в строки"""
+    id: int
+    title: str
+    content: Optional[str] = None
+    user_id: int
+    author: str
+    categories: List[str] = []
+
+    @classmethod
+    def from_post(cls, post) -> "PostSummary":
+        """Собирает ответ из Post, загруженного через post_summary_query (после posts.queries.load_categories)"""
+        return cls(
+            id=post.id,
+            title=post.title,
+            content=post.content,
+            user_id=post.user_id,
+            author=post.author.username,
+            categories=category_catalog.titles(post.category_ids),
+        )
+
+class PostSearchResult(PostSummary):
+    """Результат поиска: пост, оценка BM25 (меньше - лучше) и фрагмент с подсветкой"""
+    score: float
+    snippet: str
+
+class PopularPost(PostSummary):
+    """Пост из списка самых просматриваемых"""
+    views: int
+
+class BulkPostResult(BaseModel):
+    """Результат для одного поста из пакетной загрузки"""
+    index: int
+    id: Optional[int] = None
+    created: bool
+    detail: Optional[str] = None
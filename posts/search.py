@@ -0,0 +1,107 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+posts_fts - внешний индекс над таблицей posts (content='posts'), сам текст
+не дублируется. Триггеры на posts обновляют индекс при каждой вставке,
+изменении и удалении, в том числе при массовых операциях мимо ORM.
+
+Пересборка индекса по уже существующим данным:
+    python -m posts.search rebuild
+"""
+import sys
+
+from fastapi import HTTPException, status
+from sqlalchemy import Connection, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import Base
+from database.pagination import decode_key, encode_key
+
+# вес совпадения в заголовке выше, чем в тексте
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+SNIPPET_TOKENS = 12
+
+SEARCH_INDEX_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+)
+
+SCORE = f"bm25(posts_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT})"
+
+
+def init_search_index(connection: Connection):
+    """Создает индекс и триггеры, если их нет. Новый индекс сразу заполняется из posts"""
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+    ).first()
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        rebuild_search_index(connection)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    init_search_index(connection)
+
+
+def rebuild_search_index(connection: Connection):
+    """Полная пересборка индекса по таблице posts"""
+    connection.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+
+
+def match_query(q: str) -> str:
+    """Строка пользователя -> запрос FTS5. Каждое слово берется в кавычки,
+    чтобы операторы и спецсимволы FTS5 не ломали разбор; слова объединяются через AND"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in q.split())
+
+
+async def search_posts(db: AsyncSession, q: str, limit: int, after: str | None) -> tuple[list, str | None]:
+    """Поиск с ранжированием BM25. Курсор - пара (score, id) последнего результата.
+    Возвращает строки (id, score, snippet) и курсор следующей страницы."""
+    params = {"q": match_query(q), "limit": limit + 1}
+    keyset = ""
+    if after:
+        key = decode_key(after)
+        try:
+            params["score"], params["id"] = float(key["score"]), int(key["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный курсор.")
+        keyset = f"AND ({SCORE} > :score OR ({SCORE} = :score AND posts_fts.rowid > :id))"
+    rows = (await db.execute(text(f"""
+        SELECT posts_fts.rowid AS id, {SCORE} AS score,
+               snippet(posts_fts, -1, '<b>', '</b>', '…', {SNIPPET_TOKENS}) AS snippet
+        FROM posts_fts
+        WHERE posts_fts MATCH :q {keyset}
+        ORDER BY score, id
+        LIMIT :limit
+    """), params)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_key({"score": last.score, "id": last.id})
+    return rows[:limit], next_cursor
+
+
+if __name__ == "__main__":
+    from database.base import engine
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m posts.search rebuild")
+    with engine.begin() as connection:
+        init_search_index(connection)
+        rebuild_search_index(connection)
+    print("Индекс posts_fts пересобран")
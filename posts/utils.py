@@ -0,0 +1,51 @@
+from decouple import config
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from category_post.catalog import category_catalog
+from category_post.models import category_post
+from .models import Post
+from .scheme import PostCreate
+
+BULK_CHUNK_SIZE = config("BULK_CHUNK_SIZE", default=500, cast=int)
+MAX_BULK_POSTS = config("MAX_BULK_POSTS", default=10000, cast=int)
+
+# posts.content NOT NULL, а в PostCreate он необязателен: такие посты отклоняются до вставки
+MISSING_CONTENT = "Не указан текст поста (content)"
+
+
+def chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def existing_category_ids(db: AsyncSession, ids: set[int]) -> set[int]:
+    """Какие из категорий существуют - по каталогу в памяти, база читается только ради незнакомых id"""
+    return ids - await category_catalog.missing(db, ids)
+
+
+async def existing_post_ids(db: AsyncSession, ids: set[int]) -> set[int]:
+    """Какие из постов существуют, запросами по BULK_CHUNK_SIZE id"""
+    found = set()
+    for chunk in chunks(sorted(ids), BULK_CHUNK_SIZE):
+        found.update((await db.scalars(select(Post.id).where(Post.id.in_(chunk)))).all())
+    return found
+
+
+async def insert_posts(db: AsyncSession, user_id: int, posts: list[PostCreate]) -> list[int]:
+    """Вставка постов и их связей с категориями пачками по BULK_CHUNK_SIZE.
+    Категории должны быть проверены заранее. Коммит остается за вызывающим."""
+    post_ids = []
+    for chunk in chunks(posts, BULK_CHUNK_SIZE):
+        rows = [{"title": post.title, "content": post.content, "user_id": user_id} for post in chunk]
+        result = await db.execute(insert(Post).returning(Post.id, sort_by_parameter_order=True), rows)
+        chunk_ids = list(result.scalars())
+        associations = [
+            {"post_id": post_id, "category_id": category_id}
+            for post_id, post in zip(chunk_ids, chunk)
+            for category_id in dict.fromkeys(post.categories or [])
+        ]
+        if associations:
+            await db.execute(category_post.insert(), associations)
+        post_ids.extend(chunk_ids)
+    return post_ids
@@ -0,0 +1,179 @@
+"""Счетчики просмотров постов с отложенной записью.
+
+Просмотры копятся в памяти процесса и раз в VIEW_FLUSH_INTERVAL_SECONDS
+пишутся в post_views пачкой upsert-ов: чтение поста не берет блокировку
+записи SQLite. Последняя запись делается при остановке приложения.
+
+Самые просматриваемые посты держатся в памяти (TopK). После каждой записи
+в него попадают итоговые значения из RETURNING, а раз в
+VIEW_TOP_REFRESH_SECONDS он перечитывается из базы по индексу на views,
+чтобы учесть просмотры из других процессов.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+
+from decouple import config
+from sqlalchemy import event, select, text
+from sqlalchemy.dialects.sqlite import insert
+
+from database.base import AsyncReadSessionLocal, AsyncSessionLocal, Base
+from .models import post_views
+from .utils import BULK_CHUNK_SIZE, chunks, existing_post_ids
+
+VIEW_FLUSH_INTERVAL_SECONDS = config("VIEW_FLUSH_INTERVAL_SECONDS", default=5.0, cast=float)
+VIEW_TOP_REFRESH_SECONDS = config("VIEW_TOP_REFRESH_SECONDS", default=60.0, cast=float)
+POPULAR_TOP_K = config("POPULAR_TOP_K", default=100, cast=int)
+
+POST_VIEWS_TRIGGER = """CREATE TRIGGER IF NOT EXISTS post_views_post_ad AFTER DELETE ON posts BEGIN
+    DELETE FROM post_views WHERE post_id = old.id;
+END"""
+
+logger = logging.getLogger(__name__)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_post_views_trigger(target, connection, **kw):
+    connection.execute(text(POST_VIEWS_TRIGGER))
+
+
+class TopK:
+    """K постов с наибольшим числом просмотров. Отсортированный список
+    пересчитывается только после изменения состава или значений"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._views: dict[int, int] = {}
+        self._floor = 0
+        self._ranking: list[tuple[int, int]] | None = None
+
+    def update(self, post_id: int, views: int):
+        if post_id not in self._views and len(self._views) >= self.k:
+            if views <= self._floor:
+                return
+            del self._views[min(self._views, key=self._views.get)]
+        self._views[post_id] = views
+        self._changed()
+
+    def replace(self, rows):
+        """Новое содержимое целиком, строки (post_id, views)"""
+        self._views = dict(list(rows)[:self.k])
+        self._changed()
+
+    def discard(self, post_id: int):
+        if self._views.pop(post_id, None) is not None:
+            self._changed()
+
+    def ranking(self) -> list[tuple[int, int]]:
+        """(post_id, views) по убыванию просмотров"""
+        if self._ranking is None:
+            self._ranking = sorted(self._views.items(), key=lambda item: (-item[1], item[0]))
+        return self._ranking
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def _changed(self):
+        self._ranking = None
+        self._floor = min(self._views.values()) if len(self._views) >= self.k else 0
+
+
+class ViewCounter:
+    """Просмотры в памяти и периодическая запись их в post_views"""
+
+    def __init__(self, session_factory, read_session_factory, interval: float, top_k: int):
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory
+        self.interval = interval
+        self.top = TopK(top_k)
+        self.pending: dict[int, int] = {}
+        self.flushes = 0
+        self.flushed_views = 0
+        self._refreshed_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    def hit(self, post_id: int):
+        self.pending[post_id] = self.pending.get(post_id, 0) + 1
+
+    def forget(self, post_id: int):
+        """Пост удален: его просмотры больше не нужны"""
+        self.pending.pop(post_id, None)
+        self.top.discard(post_id)
+
+    async def flush(self):
+        """Пишет накопленные просмотры. При ошибке они возвращаются в pending"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        totals = []
+        try:
+            async with self.session_factory() as db:
+                # посты могли удалить после просмотра, их счетчики не пишем
+                existing = await existing_post_ids(db, set(pending))
+                for chunk in chunks(sorted(existing), BULK_CHUNK_SIZE):
+                    stmt = insert(post_views)
+                    rows = await db.execute(
+                        stmt.on_conflict_do_update(
+                            index_elements=[post_views.c.post_id],
+                            set_={"views": post_views.c.views + stmt.excluded.views},
+                        ).returning(post_views.c.post_id, post_views.c.views),
+                        [{"post_id": post_id, "views": pending[post_id]} for post_id in chunk],
+                    )
+                    totals.extend(rows.all())
+                await db.commit()
+        except BaseException:
+            # в том числе отмена при остановке: просмотры вернутся и запишутся в shutdown()
+            for post_id, views in pending.items():
+                self.pending[post_id] = self.pending.get(post_id, 0) + views
+            raise
+        for post_id, views in totals:
+            self.top.update(post_id, views)
+        self.flushes += 1
+        self.flushed_views += sum(pending.values())
+
+    async def refresh_top(self):
+        """Перечитывает топ из базы: ORDER BY views DESC LIMIT K по индексу"""
+        async with self.read_session_factory() as db:
+            rows = (await db.execute(
+                select(post_views.c.post_id, post_views.c.views)
+                .order_by(post_views.c.views.desc(), post_views.c.post_id)
+                .limit(self.top.k)
+            )).all()
+        self.top.replace(rows)
+        self._refreshed_at = time.monotonic()
+
+    async def start(self):
+        await self.refresh_top()
+        # пустой контекст: запросы фоновой задачи не относятся ни к одному HTTP-запросу
+        self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "flushes": self.flushes,
+            "flushed_views": self.flushed_views,
+            "top": len(self.top),
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._refreshed_at >= VIEW_TOP_REFRESH_SECONDS:
+                    await self.refresh_top()
+            except Exception:
+                logger.exception("Не удалось записать просмотры постов")
+
+
+view_counter = ViewCounter(AsyncSessionLocal, AsyncReadSessionLocal, VIEW_FLUSH_INTERVAL_SECONDS, POPULAR_TOP_K)
@@ -0,0 +1,116 @@
+"""Фоновая очистка удаленных пользователей и постов.
+
+Маршруты удаления только добавляют строку в deleted_users или
+deleted_posts - объект сразу пропадает из чтения (purge.utils.visible_*).
+Purger вычищает данные пачками по PURGE_BATCH_SIZE постов: каждая пачка -
+своя короткая транзакция, между пачками пауза PURGE_PAUSE_SECONDS, чтобы
+блокировка записи SQLite доставалась и обработчикам запросов.
+
+Задания живут в базе, поэтому после сбоя или перезапуска очистка
+продолжается с того места, где остановилась. Кроме пробуждения после
+удаления, Purger раз в PURGE_INTERVAL_SECONDS проверяет задания,
+оставленные другими воркерами.
+
+Пользователь вычищается не раньше, чем через PURGE_USER_DELAY_SECONDS
+после удаления (по умолчанию - срок жизни кеша токенов): до этого другие
+воркеры могут пускать его по закешированному токену, и пока отметка в
+deleted_users есть, его новые посты скрыты и вычищаются вместе с остальными.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+
+from decouple import config
+from sqlalchemy import select
+
+from database.base import AsyncSessionLocal
+from http_cache.utils import CATEGORIES, response_cache
+from .models import deleted_users
+from users.cache import PRINCIPAL_CACHE_TTL_SECONDS
+from .utils import PURGE_BATCH_SIZE, purge_posts_batch, purge_user_batch
+
+PURGE_INTERVAL_SECONDS = config("PURGE_INTERVAL_SECONDS", default=30.0, cast=float)
+PURGE_PAUSE_SECONDS = config("PURGE_PAUSE_SECONDS", default=0.01, cast=float)
+PURGE_USER_DELAY_SECONDS = config("PURGE_USER_DELAY_SECONDS", default=float(PRINCIPAL_CACHE_TTL_SECONDS), cast=float)
+
+logger = logging.getLogger(__name__)
+
+
+class Purger:
+    """Очередь заданий в deleted_users / deleted_posts, разбирается одной фоновой задачей"""
+
+    def __init__(self, session_factory, batch_size: int, interval: float, pause: float, user_delay: float):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.user_delay = user_delay
+        self.batches = 0
+        self.purged_users = 0
+        self.purged_posts = 0
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def wake(self):
+        """Вызывается после удаления, чтобы не ждать следующей проверки"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run_once(self) -> int:
+        """Разбирает все готовые задания: сначала пользователей, удаленных раньше user_delay, потом
+        отдельные посты. Возвращает число пачек"""
+        batches = 0
+        while True:
+            async with self.session_factory() as db:
+                user_id = await db.scalar(
+                    select(deleted_users.c.user_id).where(deleted_users.c.requested_at <= time.time() - self.user_delay)
+                    .order_by(deleted_users.c.requested_at).limit(1))
+                if user_id is not None:
+                    purged = await purge_user_batch(db, user_id, self.batch_size)
+                else:
+                    purged = await purge_posts_batch(db, self.batch_size)
+                await db.commit()
+            if user_id is None and not purged:
+                break
+            batches += 1
+            self.batches += 1
+            self.purged_posts += purged
+            if user_id is not None and not purged:
+                self.purged_users += 1
+            await asyncio.sleep(self.pause)
+        if batches:
+            # вместе с постами уменьшились счетчики категорий
+            await response_cache.bump(CATEGORIES)
+        return batches
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        # пустой контекст: запросы фоновой задачи не относятся ни к одному HTTP-запросу
+        self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def shutdown(self):
+        """Останавливает очистку посреди работы: закоммиченные пачки сохранены, остальное - при следующем запуске"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "purged_users": self.purged_users, "purged_posts": self.purged_posts}
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Не удалось вычистить удаленные данные")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+
+
+purger = Purger(AsyncSessionLocal, PURGE_BATCH_SIZE, PURGE_INTERVAL_SECONDS, PURGE_PAUSE_SECONDS,
+                PURGE_USER_DELAY_SECONDS)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, Table
+
+from database.base import Base
+
+
+# пользователи и посты, удаленные, но еще не вычищенные фоновой задачей (purge.jobs.Purger).
+# Строка здесь скрывает объект из чтения и одновременно служит заданием: она удаляется
+# последней, в одной транзакции с самим объектом, поэтому после сбоя задание продолжится.
+deleted_users = Table("deleted_users",
+                      Base.metadata,
+                      Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+                      Column("requested_at", Float, nullable=False),
+                      Column("purged_posts", Integer, nullable=False, server_default="0"),
+                      )
+
+deleted_posts = Table("deleted_posts",
+                      Base.metadata,
+                      Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
+                      Column("requested_at", Float, nullable=False),
+                      )
@@ -0,0 +1,73 @@
+import time
+
+from decouple import config
+from sqlalchemy import and_, delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from category_post.models import category_post
+from feed.models import feed_affinity, feed_seen
+from posts.models import Post
+from users.models import User
+from .models import deleted_posts, deleted_users
+
+PURGE_BATCH_SIZE = config("PURGE_BATCH_SIZE", default=500, cast=int)
+
+
+def visible_posts():
+    """Условие для выборок постов: ни пост, ни его автор не ждут удаления.
+    Подзапросы не коррелированные, SQLite строит по ним временный индекс один раз на запрос."""
+    return and_(Post.id.not_in(select(deleted_posts.c.post_id)), Post.user_id.not_in(select(deleted_users.c.user_id)))
+
+
+def visible_users():
+    """Условие для выборок пользователей: пользователь не ждет удаления"""
+    return User.id.not_in(select(deleted_users.c.user_id))
+
+
+async def is_user_deleted(db: AsyncSession, user_id: int) -> bool:
+    """Поиск отметки по первичному ключу - для пользователей из кеша токенов"""
+    return await db.scalar(select(deleted_users.c.user_id).where(deleted_users.c.user_id == user_id)) is not None
+
+
+async def mark_user_deleted(db: AsyncSession, user_id: int):
+    """Мгновенное удаление: пользователь и его посты пропадают из чтения, данные вычистит Purger"""
+    await db.execute(insert(deleted_users).values(user_id=user_id, requested_at=time.time()).on_conflict_do_nothing())
+
+
+async def mark_post_deleted(db: AsyncSession, post_id: int):
+    await db.execute(insert(deleted_posts).values(post_id=post_id, requested_at=time.time()).on_conflict_do_nothing())
+
+
+async def delete_posts(db: AsyncSession, post_ids: list[int]):
+    """Посты и их связи с категориями - по одному DELETE на таблицу.
+    Индекс поиска, счетчики категорий и просмотры чистят триггеры, сами категории не трогаются."""
+    await db.execute(delete(category_post).where(category_post.c.post_id.in_(post_ids)))
+    await db.execute(delete(Post.__table__).where(Post.id.in_(post_ids)))
+
+
+async def purge_posts_batch(db: AsyncSession, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Пачка заданий из deleted_posts. Возвращает число вычищенных постов, коммит - за вызывающим"""
+    post_ids = list((await db.scalars(
+        select(deleted_posts.c.post_id).order_by(deleted_posts.c.post_id).limit(batch_size))).all())
+    if post_ids:
+        await delete_posts(db, post_ids)
+        await db.execute(delete(deleted_posts).where(deleted_posts.c.post_id.in_(post_ids)))
+    return len(post_ids)
+
+
+async def purge_user_batch(db: AsyncSession, user_id: int, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Следующая пачка постов пользователя, а когда постов не осталось - его лента и он сам.
+    Возвращает число вычищенных постов, 0 - пользователь удален. Коммит - за вызывающим."""
+    post_ids = list((await db.scalars(
+        select(Post.id).where(Post.user_id == user_id).order_by(Post.id).limit(batch_size))).all())
+    if post_ids:
+        await delete_posts(db, post_ids)
+        await db.execute(update(deleted_users).where(deleted_users.c.user_id == user_id)
+                         .values(purged_posts=deleted_users.c.purged_posts + len(post_ids)))
+        return len(post_ids)
+    await db.execute(delete(feed_seen).where(feed_seen.c.user_id == user_id))
+    await db.execute(delete(feed_affinity).where(feed_affinity.c.user_id == user_id))
+    await db.execute(delete(User.__table__).where(User.id == user_id))
+    await db.execute(delete(deleted_users).where(deleted_users.c.user_id == user_id))
+    return 0
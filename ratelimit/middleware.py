@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+
+import orjson
+
+from users.utils import decode_token
+from .utils import RATE_LIMIT_TOKEN_CACHE_SIZE, RATE_LIMIT_TRUST_FORWARDED, RateLimiter, rate_limiter
+
+TOO_MANY_REQUESTS_BODY = orjson.dumps({"detail": "Слишком много запросов, повторите позже."})
+
+
+class TokenIdentities:
+    """LRU токен -> пользователь: jwt.decode стоит ~0.1ms, а токен приходит с каждым запросом клиента.
+    Запись живет до exp токена; отзыв токена здесь не важен - лимит все равно считается по пользователю."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+
+    def get(self, token: str) -> str | None:
+        entry = self._entries.get(token)
+        if entry is not None and entry[0] > time.time():
+            self._entries.move_to_end(token)
+            return entry[1]
+        payload = decode_token(token) or {}
+        username = payload.get("sub")
+        # неверный токен тоже запоминаем ненадолго, чтобы мусор в заголовке не заставлял декодировать снова
+        expires_at = payload.get("exp") or time.time() + 60
+        self._entries[token] = (expires_at, username)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return username
+
+
+token_identities = TokenIdentities(RATE_LIMIT_TOKEN_CACHE_SIZE)
+
+
+def client_identity(scope) -> str:
+    """Пользователь из проверенного JWT, иначе IP-адрес клиента"""
+    forwarded = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                username = token_identities.get(token)
+                if username:
+                    return "user:" + username
+        elif name == b"x-forwarded-for" and RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return "ip:" + (forwarded or (client[0] if client else "unknown"))
+
+
+class RateLimitMiddleware:
+    """ASGI-middleware перед маршрутами: 429 с Retry-After, когда корзина клиента пуста,
+    заголовки RateLimit-* - в каждом ответе ограниченного маршрута"""
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = self.limiter.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, headers = await self.limiter.hit(rule, client_identity(scope))
+        if not allowed:
+            await send({"type": "http.response.start", "status": 429, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(TOO_MANY_REQUESTS_BODY)).encode()),
+                *headers,
+            ]})
+            await send({"type": "http.response.body", "body": TOO_MANY_REQUESTS_BODY})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
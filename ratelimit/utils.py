@@ -0,0 +1,144 @@
+"""Ограничение частоты запросов по маршруту и клиенту (token bucket).
+
+Правило "МЕТОД путь=лимит/период" дает каждому клиенту корзину на limit
+запросов, которая пополняется со скоростью limit/period в секунду: можно
+сделать limit запросов подряд, дальше - не чаще, чем позволяет пополнение.
+Путь может содержать параметры, как в маршрутах: GET /posts/get/{id}.
+Запросы, не попавшие ни в одно правило, считаются по правилу "*".
+Лимит 0 (можно без периода: "GET /metrics=0") - маршрут не ограничивается.
+
+Клиент - пользователь из JWT, без токена - IP-адрес.
+"""
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from decouple import config
+from redis.exceptions import RedisError
+from starlette.routing import compile_path
+
+from .backends import MemoryRateLimitBackend, RedisRateLimitBackend
+
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", default="redis") # redis или memory
+RATE_LIMITS = config("RATE_LIMITS", default=(
+    "POST /users/login/=10/60, POST /users/register/=5/60, "
+    "POST /posts/create=30/60, POST /posts/bulk=5/60, POST /feed/swipe=120/60, *=1200/60"
+))
+RATE_LIMIT_MEMORY_KEYS = config("RATE_LIMIT_MEMORY_KEYS", default=100000, cast=int)
+RATE_LIMIT_TOKEN_CACHE_SIZE = config("RATE_LIMIT_TOKEN_CACHE_SIZE", default=10000, cast=int)
+# после ошибки Redis столько секунд считаем в памяти, не пытаясь к нему подключиться
+RATE_LIMIT_REDIS_RETRY_SECONDS = config("RATE_LIMIT_REDIS_RETRY_SECONDS", default=5.0, cast=float)
+# брать IP из X-Forwarded-For - только за своим прокси, иначе клиент подставит любой адрес
+RATE_LIMIT_TRUST_FORWARDED = config("RATE_LIMIT_TRUST_FORWARDED", default=False, cast=bool)
+
+DEFAULT_RULE = "*"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    limit: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+
+def parse_rules(value: str) -> dict[str, Rule]:
+    """"POST /users/login/=10/60, *=1200/60" -> {имя: правило}"""
+    rules = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            name, quota = item.rsplit("=", 1)
+            limit, _, period = quota.partition("/")
+            rule = Rule(" ".join(name.split()), int(limit), float(period or (1 if limit.strip() == "0" else "")))
+        except ValueError:
+            raise ValueError(f"Неверное правило RATE_LIMITS: {item!r}, ожидается 'МЕТОД путь=лимит/период'") from None
+        if (rule.name != DEFAULT_RULE and len(rule.name.split(" ")) != 2) or rule.limit < 0 or rule.period <= 0:
+            raise ValueError(f"Неверное правило RATE_LIMITS: {item!r}")
+        rules[rule.name] = rule
+    return rules
+
+
+class RateLimiter:
+    """Поиск правила по методу и пути и списание из корзины клиента.
+    Если Redis недоступен, на RATE_LIMIT_REDIS_RETRY_SECONDS переключается на корзины в памяти."""
+
+    def __init__(self, backend, rules: dict[str, Rule], fallback: MemoryRateLimitBackend, retry_seconds: float):
+        self.backend = backend
+        self.fallback = fallback
+        self.retry_seconds = retry_seconds
+        self.default = rules.get(DEFAULT_RULE)
+        self._exact: dict[tuple[str, str], Rule] = {}
+        self._templates = []
+        for rule in rules.values():
+            if rule.name == DEFAULT_RULE:
+                continue
+            method, path = rule.name.split(" ")
+            if "{" in path:
+                self._templates.append((method, compile_path(path)[0], rule))
+            else:
+                self._exact[(method, path)] = rule
+        # постоянная часть заголовков каждого правила
+        self._headers = {rule.name: [(b"ratelimit-limit", str(rule.limit).encode()),
+                                     (b"ratelimit-policy", f"{rule.limit};w={rule.period:g}".encode())]
+                         for rule in rules.values()}
+        self._backend_down_until = 0.0
+        self.limited: Counter = Counter()
+        self.fallbacks = 0
+
+    def match(self, method: str, path: str) -> Rule | None:
+        rule = self._exact.get((method, path))
+        if rule is None:
+            for rule_method, pattern, template_rule in self._templates:
+                if rule_method == method and pattern.match(path):
+                    rule = template_rule
+                    break
+            else:
+                rule = self.default
+        return rule if rule is not None and rule.limit else None
+
+    async def hit(self, rule: Rule, client: str) -> tuple[bool, list[tuple[bytes, bytes]]]:
+        """Списывает запрос из корзины клиента. Возвращает разрешение и заголовки RateLimit-*"""
+        allowed, tokens = await self._take(f"{rule.name}|{client}", rule)
+        headers = [
+            *self._headers[rule.name],
+            (b"ratelimit-remaining", str(max(int(tokens), 0)).encode()),
+            (b"ratelimit-reset", str(math.ceil((rule.limit - tokens) / rule.rate)).encode()),
+        ]
+        if not allowed:
+            self.limited[rule.name] += 1
+            headers.append((b"retry-after", str(max(math.ceil((1 - tokens) / rule.rate), 1)).encode()))
+        return allowed, headers
+
+    async def _take(self, key: str, rule: Rule) -> tuple[bool, float]:
+        if self.backend is not self.fallback and time.monotonic() >= self._backend_down_until:
+            try:
+                return await self.backend.take(key, rule.limit, rule.rate)
+            except (RedisError, OSError) as error:
+                self._backend_down_until = time.monotonic() + self.retry_seconds
+                logger.warning("Redis для ограничения частоты недоступен (%s), %.0fs считаем в памяти",
+                               error, self.retry_seconds)
+        self.fallbacks += self.backend is not self.fallback
+        return await self.fallback.take(key, rule.limit, rule.rate)
+
+    def stats(self) -> dict:
+        return {"limited": dict(self.limited), "fallbacks": self.fallbacks, "memory_buckets": len(self.fallback)}
+
+
+def _create_limiter() -> RateLimiter:
+    fallback = MemoryRateLimitBackend(RATE_LIMIT_MEMORY_KEYS)
+    backend = fallback
+    if RATE_LIMIT_BACKEND == "redis":
+        from users.config import ASYNC_REDIS_CLIENT
+        backend = RedisRateLimitBackend(ASYNC_REDIS_CLIENT)
+    return RateLimiter(backend, parse_rules(RATE_LIMITS), fallback, RATE_LIMIT_REDIS_RETRY_SECONDS)
+
+
+rate_limiter = _create_limiter()
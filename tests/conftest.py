@@ -0,0 +1,20 @@
+"""Общая настройка тестов.
+
+Настройки читаются при импорте модулей, поэтому окружение задается здесь,
+до импорта приложения. База тестов создается во временной директории
+и не трогает ./database.db.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='blog_tests_'), 'database.db')}"
+# тесты не требуют запущенного Redis
+os.environ.setdefault("REVOCATION_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
@@ -0,0 +1,62 @@
+"""Нет N+1: число SQL-запросов на страницу постов не зависит от размера страницы"""
+import asyncio
+
+import httpx
+from sqlalchemy import event
+
+from main import app
+from category_post.models import Category, category_post
+from database.base import AsyncSessionLocal, read_engine
+from posts.models import Post
+from users.models import User
+
+SIZES = (1, 10, 100, 400)
+
+
+async def seed():
+    async with AsyncSessionLocal() as db:
+        users = [User(username=f"author{i}", password="-") for i in range(20)]
+        categories = [Category(title=f"category{i}") for i in range(5)]
+        db.add_all(users + categories)
+        await db.flush()
+        posts = [Post(title=f"post {i}", content="text", user_id=users[i % len(users)].id) for i in range(max(SIZES))]
+        db.add_all(posts)
+        await db.flush()
+        await db.execute(category_post.insert(), [
+            {"post_id": post.id, "category_id": categories[(post.id + k) % len(categories)].id}
+            for post in posts for k in range(2)
+        ])
+        await db.commit()
+
+
+async def page_queries() -> tuple[dict[int, int], dict]:
+    await seed()
+    statements = []
+
+    # списки читаются через read_engine
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(read_engine.sync_engine, "before_cursor_execute", count)
+    counts = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        # lifespan загружает каталог категорий и в конце закрывает движки
+        async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for size in SIZES:
+                statements.clear()
+                body = (await client.get("/posts/get", params={"limit": size})).json()
+                assert len(body["items"]) == size, body
+                assert all(item["author"] and len(item["categories"]) == 2 for item in body["items"])
+                assert all("password" not in item for item in body["items"])
+                counts[size] = len(statements)
+            users_page = (await client.get("/users/all_users", params={"limit": 5})).json()
+    finally:
+        event.remove(read_engine.sync_engine, "before_cursor_execute", count)
+    return counts, users_page
+
+
+def test_post_page_query_count_is_constant():
+    counts, users_page = asyncio.run(page_queries())
+    assert len(set(counts.values())) == 1, f"число запросов растет с размером страницы: {counts}"
+    assert all("password" not in user for user in users_page["items"]), users_page
@@ -0,0 +1,44 @@
+import pytest
+
+from ratelimit.backends import MemoryRateLimitBackend
+from ratelimit.utils import RateLimiter, Rule, parse_rules
+
+
+def limiter(value: str) -> RateLimiter:
+    fallback = MemoryRateLimitBackend(100)
+    return RateLimiter(fallback, parse_rules(value), fallback, retry_seconds=1)
+
+
+def test_parse_rules():
+    rules = parse_rules(" POST  /users/login/=10/60, GET /metrics=0,, *=1200/60 ")
+    assert rules == {
+        "POST /users/login/": Rule("POST /users/login/", 10, 60),
+        "GET /metrics": Rule("GET /metrics", 0, 1),
+        "*": Rule("*", 1200, 60),
+    }
+    assert rules["*"].rate == 20
+
+
+@pytest.mark.parametrize("value", [
+    "POST /users/login/", "POST /users/login/=10", "POST /users/login/=x/60", "/users/login/=10/60",
+    "POST /users/login/=-1/60", "POST /users/login/=10/0",
+])
+def test_parse_rules_rejects(value):
+    with pytest.raises(ValueError):
+        parse_rules(value)
+
+
+def test_match():
+    rate_limiter = limiter("POST /posts/create=30/60, GET /posts/get/{id}=100/60, "
+                           "GET /posts/get/1=5/60, GET /metrics=0, *=1200/60")
+    assert rate_limiter.match("POST", "/posts/create").limit == 30
+    assert rate_limiter.match("GET", "/posts/get/1").limit == 5
+    assert rate_limiter.match("GET", "/posts/get/2").name == "GET /posts/get/{id}"
+    assert rate_limiter.match("POST", "/posts/get/2").name == "*"
+    assert rate_limiter.match("GET", "/posts/get/2/extra").name == "*"
+    assert rate_limiter.match("GET", "/metrics") is None
+
+
+def test_match_without_default():
+    rate_limiter = limiter("POST /posts/create=30/60")
+    assert rate_limiter.match("GET", "/posts/get") is None
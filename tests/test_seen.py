@@ -0,0 +1,48 @@
+from feed.seen import ARRAY_LIMIT, ARRAY_TAG, BITMAP_TAG, CHUNK_BITS, Chunk, SeenSet, chunk_numbers
+
+
+def test_chunk_array_round_trip():
+    chunk = Chunk()
+    assert chunk.add_many([5, 3, 5, 70000 & 0xFFFF]) == 3
+    assert chunk.add_many([3, 9]) == 1
+    data = chunk.dump()
+    assert data[:1] == ARRAY_TAG
+
+    loaded = Chunk.load(data)
+    assert loaded.bitmap is None
+    assert list(loaded.values) == sorted({3, 5, 9, 70000 & 0xFFFF})
+    assert loaded.size == 4
+    assert 9 in loaded and 4 not in loaded
+
+
+def test_chunk_converts_to_bitmap_past_array_limit():
+    chunk = Chunk()
+    assert chunk.add_many(range(0, 2 * ARRAY_LIMIT, 2)) == ARRAY_LIMIT
+    assert chunk.bitmap is None
+    assert chunk.add_many([1, 2]) == 1
+    assert chunk.bitmap is not None
+    assert chunk.size == ARRAY_LIMIT + 1
+    assert all(low in chunk for low in range(0, 2 * ARRAY_LIMIT, 2))
+    assert 1 in chunk and 3 not in chunk
+
+    data = chunk.dump()
+    assert data[:1] == BITMAP_TAG
+    loaded = Chunk.load(data)
+    assert loaded.size == chunk.size
+    assert loaded.add_many([3, 4]) == 1
+    assert 3 in loaded
+
+
+def test_seen_set_changed_chunks_and_round_trip():
+    seen = SeenSet()
+    second = 2 << CHUNK_BITS
+    assert seen.add_many([1, 2, second + 7]) == {0, 2}
+    assert seen.add_many([1, second + 7]) == set()
+    assert seen.add_many([2, 3]) == {0}
+    assert len(seen) == 4
+
+    loaded = SeenSet.load((number, seen.dump(number)) for number in chunk_numbers([1, second]))
+    assert len(loaded) == 4
+    assert {1, 2, 3, second + 7} == {post_id for post_id in range(second + 10) if post_id in loaded}
+    assert (1 << CHUNK_BITS) + 1 not in loaded
+    assert Chunk.load(loaded.dump(1)).size == 0
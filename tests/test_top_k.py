@@ -0,0 +1,50 @@
+import pytest
+
+from posts.views import TopK
+
+
+def test_update_evicts_minimum():
+    top = TopK(3)
+    for post_id, views in ((1, 10), (2, 30), (3, 20)):
+        top.update(post_id, views)
+    top.update(4, 25)
+    assert top.ranking() == [(2, 30), (4, 25), (3, 20)]
+
+
+@pytest.mark.parametrize("views", [5, 10])
+def test_update_ignores_views_at_or_below_floor(views):
+    top = TopK(2)
+    top.update(1, 10)
+    top.update(2, 20)
+    top.update(3, views)
+    assert len(top) == 2
+    assert top.ranking() == [(2, 20), (1, 10)]
+
+
+def test_update_existing_raises_floor():
+    top = TopK(2)
+    top.update(1, 10)
+    top.update(2, 20)
+    top.update(1, 40)
+    top.update(3, 15)
+    assert top.ranking() == [(1, 40), (2, 20)]
+
+
+def test_ranking_ties_by_id():
+    top = TopK(5)
+    for post_id in (3, 1, 2):
+        top.update(post_id, 7)
+    assert top.ranking() == [(1, 7), (2, 7), (3, 7)]
+
+
+def test_replace_and_discard():
+    top = TopK(2)
+    top.update(9, 100)
+    top.replace([(1, 50), (2, 40), (3, 30)])
+    assert top.ranking() == [(1, 50), (2, 40)]
+    top.discard(1)
+    top.discard(42)
+    assert top.ranking() == [(2, 40)]
+    # после discard есть свободное место, порог не мешает
+    top.update(3, 1)
+    assert top.ranking() == [(2, 40), (3, 1)]
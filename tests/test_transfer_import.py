@@ -0,0 +1,77 @@
+import orjson
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+import main  # noqa: F401 - регистрирует все модели в Base.metadata
+from category_post.models import category_post
+from database.base import Base
+from posts.models import Post
+from transfer.models import import_progress
+from transfer.utils import ImportConflict, Importer, import_lines
+from users.models import User
+
+
+def line(table, **row):
+    return orjson.dumps({"table": table, "row": row})
+
+
+LINES = [
+    *(line("users", id=i, username=f"user{i}", password="-") for i in (1, 2, 3)),
+    *(line("categories", id=i, title=f"category{i}") for i in (1, 2)),
+    *(line("posts", id=i, title=f"post {i}", content="text", user_id=1 + i % 3) for i in (1, 2, 3, 4)),
+    *(line("category_post", post_id=i, category_id=1 + i % 2) for i in (1, 2, 3, 4)),
+]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupted(lines, after):
+    for number, item in enumerate(lines, 1):
+        if number > after:
+            raise Interrupted
+        yield item
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def count(session, table):
+    return session.scalar(select(func.count()).select_from(table))
+
+
+def test_resume_skips_committed_lines(session):
+    with pytest.raises(Interrupted):
+        import_lines(session, interrupted(LINES, 7), Importer("job", commit_rows=3))
+    # закоммичены две пачки по 3 строки, седьмая строка откатилась
+    assert session.scalar(select(import_progress.c.line).where(import_progress.c.job == "job")) == 6
+    assert (count(session, User), count(session, Post)) == (3, 1)
+
+    result = import_lines(session, LINES, Importer("job", commit_rows=3))
+    assert result["resumed_from"] == 6
+    assert result["line"] == len(LINES)
+    assert result["inserted"] == {"users": 0, "categories": 0, "posts": 3, "category_post": 4}
+    assert (count(session, User), count(session, Post), count(session, category_post)) == (3, 4, 4)
+
+
+def test_new_job_refuses_nonempty_tables(session):
+    import_lines(session, LINES[:3], Importer("first"))
+    with pytest.raises(ImportConflict):
+        import_lines(session, LINES, Importer("second"))
+    assert count(session, import_progress) == 1
+
+
+def test_colliding_parent_rows_abort_import(session):
+    import_lines(session, LINES[:3], Importer("first"))
+    with pytest.raises(ImportConflict):
+        import_lines(session, LINES, Importer("second", allow_nonempty=True))
+    assert (count(session, User), count(session, Post)) == (3, 0)
+    assert session.scalar(select(import_progress.c.line).where(import_progress.c.job == "second")) is None
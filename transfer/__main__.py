@@ -0,0 +1,85 @@
+"""Выгрузка и загрузка базы в NDJSON из командной строки (формат - в transfer.utils).
+
+    python -m transfer export [--tables users posts] [--output dump.ndjson]
+    python -m transfer import dump.ndjson [--job имя] [--defer-triggers] [--allow-nonempty]
+
+Загрузку, прерванную на середине, достаточно запустить заново той же
+командой: задание по умолчанию называется по абсолютному пути файла.
+--defer-triggers на время загрузки снимает триггеры поиска и счетчиков
+категорий и пересчитывает их в конце - так быстрее для больших файлов,
+но приложение в это время не должно писать в базу. Если процесс был
+убит, триггеры вернет повторный запуск той же командой.
+Новое задание загружает только в пустые таблицы; --allow-nonempty
+разрешает заполненные, но совпадение ключей все равно останавливает загрузку.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+from transfer.utils import TABLES, ImportConflict, Importer, drop_insert_triggers, export_tables, import_lines, restore_insert_triggers
+
+
+def export_command(args):
+    from database.base import engine
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        with engine.connect() as connection:
+            for chunk in export_tables(connection, [name for name in TABLES if name in args.tables]):
+                output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+def import_command(args):
+    from database.base import SessionLocal, engine
+
+    if args.file == "-" and not args.job:
+        sys.exit("для загрузки из stdin нужен --job")
+    job = args.job or os.path.abspath(args.file)
+    source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    started = time.perf_counter()
+    if args.defer_triggers:
+        with engine.begin() as connection:
+            drop_insert_triggers(connection)
+    try:
+        with source, SessionLocal() as session:
+            result = import_lines(session, source, Importer(job, args.allow_nonempty))
+    except ImportConflict as error:
+        sys.exit(f"{error}\nДля заполненной базы загрузите файл с непересекающимися ключами или в пустую базу")
+    except ValueError as error:
+        sys.exit(f"{error}\nЗакоммиченные строки сохранены, после исправления файла запустите ту же команду")
+    finally:
+        if args.defer_triggers:
+            with engine.begin() as connection:
+                restore_insert_triggers(connection)
+    elapsed = time.perf_counter() - started
+    rows = sum(result["inserted"].values())
+    print(f"{result} за {elapsed:.1f}s, {rows / elapsed:.0f} строк/с", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m transfer", description="Выгрузка и загрузка базы в NDJSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="выгрузка в файл или stdout")
+    export.add_argument("--tables", nargs="+", choices=list(TABLES), default=list(TABLES))
+    export.add_argument("--output", help="файл, по умолчанию stdout")
+    export.set_defaults(handler=export_command)
+    load = commands.add_parser("import", help="загрузка из файла или stdin (-)")
+    load.add_argument("file")
+    load.add_argument("--job", help="имя задания для продолжения, по умолчанию путь файла")
+    load.add_argument("--defer-triggers", action="store_true", help="пересчитать поиск и счетчики в конце")
+    load.add_argument("--allow-nonempty", action="store_true",
+                      help="загружать в заполненные таблицы, если ключи не совпадают с ключами базы")
+    load.set_defaults(handler=import_command)
+    args = parser.parse_args()
+
+    importlib.import_module("main")  # регистрирует все модели и создает таблицы
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
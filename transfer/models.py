@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, Table
+
+from database.base import Base
+
+
+# сколько строк файла импорта уже закоммичено, по имени задания (см. transfer.utils.Importer)
+import_progress = Table("import_progress",
+                        Base.metadata,
+                        Column("job", String(255), primary_key=True),
+                        Column("line", Integer, nullable=False, server_default="0"),
+                        )
@@ -0,0 +1,57 @@
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.base import AsyncReadSessionLocal, get_async_db
+from http_cache.utils import CATEGORIES, POSTS, response_cache
+from users.utils import get_admin_user
+from .scheme import ImportResult
+from .utils import TABLES, ImportConflict, Importer, split_lines, stream_tables
+
+TableName = Literal["users", "categories", "posts", "category_post"]
+
+
+def register_transfer_routers() -> APIRouter:
+    routers = APIRouter(prefix="/admin", tags=["Администрирование"], dependencies=[Depends(get_admin_user)])
+
+    @routers.get("/export", response_class=StreamingResponse)
+    async def export_tables(tables: List[TableName] = Query(list(TABLES))):
+        """Выгрузка таблиц в NDJSON потоком, в порядке внешних ключей.
+        Сессия открывается внутри генератора, как в database.pagination.ndjson_response."""
+        names = [name for name in TABLES if name in tables]
+
+        async def generate():
+            async with AsyncReadSessionLocal() as db:
+                async for chunk in stream_tables(db, names):
+                    yield chunk
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    @routers.post("/import", response_model=ImportResult)
+    async def import_tables(request: Request, job: str = Query(..., min_length=1, max_length=255),
+                            allow_nonempty: bool = False, db: AsyncSession = Depends(get_async_db)):
+        """Загрузка NDJSON из тела запроса с коммитом каждые IMPORT_COMMIT_ROWS строк.
+        После обрыва тот же файл отправляется заново с тем же job: закоммиченные строки пропускаются.
+        Новое задание загружает только в пустые таблицы, если не передан allow_nonempty (409)."""
+        importer = Importer(job, allow_nonempty)
+        try:
+            await db.run_sync(importer.resume)
+            async for line in split_lines(request.stream()):
+                if importer.add(line):
+                    await db.run_sync(importer.write)
+                    await db.commit()
+            await db.run_sync(importer.write)
+            await db.commit()
+        except ImportConflict as error:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+        except ValueError as error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+        finally:
+            if any(importer.inserted.values()):
+                await response_cache.bump(POSTS, CATEGORIES)
+        return importer.result()
+
+    return routers
@@ -0,0 +1,13 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class ImportResult(BaseModel):
+    """Итог загрузки: line - сколько строк файла обработано, resumed_from - с какой строки продолжили,
+    skipped - связи category_post, которые уже были в базе"""
+    job: str
+    line: int
+    resumed_from: int
+    inserted: Dict[str, int]
+    skipped: Dict[str, int]
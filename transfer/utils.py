@@ -0,0 +1,202 @@
+"""Выгрузка и загрузка данных в NDJSON.
+
+Одна строка - одна запись: {"table": "posts", "row": {...}}. Таблицы идут
+в порядке внешних ключей (TABLES). Выгрузка читает каждую таблицу курсором
+пачками по EXPORT_BATCH_SIZE (yield_per), память не зависит от размера базы.
+
+Загрузка читает тот же формат построчно и вставляет строки пачками
+executemany по IMPORT_BATCH_SIZE, коммит - каждые IMPORT_COMMIT_ROWS
+строк. В той же транзакции в import_progress пишется номер последней
+строки файла, поэтому прерванную загрузку можно запустить заново с тем же
+заданием: закоммиченные строки пропускаются.
+
+Ключи переносятся как есть, поэтому новое задание по умолчанию загружает
+только в пустые таблицы. С allow_nonempty таблицы могут быть заполнены,
+но совпадение ключа у пользователя, категории или поста останавливает
+загрузку: иначе посты и связи из файла достались бы чужим строкам базы.
+Совпавшие связи category_post просто пропускаются (ON CONFLICT DO NOTHING).
+"""
+from collections import Counter
+from typing import AsyncIterator, Iterable, Iterator
+
+import orjson
+from decouple import config
+from sqlalchemy import Connection, Select, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from category_post.models import CATEGORY_STATS_TRIGGERS, Category, category_post, rebuild_category_stats
+from posts.models import Post
+from posts.search import init_search_index, rebuild_search_index
+from posts.utils import chunks
+from users.models import User
+from .models import import_progress
+
+EXPORT_BATCH_SIZE = config("EXPORT_BATCH_SIZE", default=5000, cast=int)
+IMPORT_BATCH_SIZE = config("IMPORT_BATCH_SIZE", default=5000, cast=int)
+IMPORT_COMMIT_ROWS = config("IMPORT_COMMIT_ROWS", default=50000, cast=int)
+
+TABLES = {
+    "users": User.__table__,
+    "categories": Category.__table__,
+    "posts": Post.__table__,
+    "category_post": category_post,
+}
+# str(): orjson не принимает подклассы str (quoted_name) в ключах
+COLUMNS = {name: tuple(str(key) for key in table.columns.keys()) for name, table in TABLES.items()}
+COLUMN_SETS = {name: frozenset(columns) for name, columns in COLUMNS.items()}
+
+# на строки этих таблиц ссылаются другие строки файла, пропускать их нельзя
+PARENT_TABLES = ("users", "categories", "posts")
+
+# триггеры на вставку, которые при массовой загрузке дешевле заменить пересчетом в конце
+INSERT_TRIGGERS = ("posts_fts_ai", "category_stats_ai")
+
+
+class ImportConflict(ValueError):
+    """Загрузка в заполненную базу без разрешения или совпадение ключей с ее строками"""
+
+
+def export_statement(name: str) -> Select:
+    table = TABLES[name]
+    return select(table).order_by(*table.primary_key.columns)
+
+
+def encode_rows(name: str, rows) -> bytes:
+    columns = COLUMNS[name]
+    return b"".join(orjson.dumps({"table": name, "row": dict(zip(columns, row))}) + b"\n" for row in rows)
+
+
+def export_tables(connection: Connection, names: Iterable[str]) -> Iterator[bytes]:
+    """NDJSON по таблицам names, кусок на каждую пачку курсора"""
+    for name in names:
+        result = connection.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(export_statement(name))
+        for partition in result.partitions():
+            yield encode_rows(name, partition)
+
+
+async def stream_tables(db: AsyncSession, names: Iterable[str]) -> AsyncIterator[bytes]:
+    """То же для асинхронной сессии"""
+    for name in names:
+        result = await db.stream(export_statement(name).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield encode_rows(name, partition)
+
+
+async def split_lines(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Куски тела запроса -> строки"""
+    tail = b""
+    async for chunk in body:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line
+    if tail:
+        yield tail
+
+
+class Importer:
+    """Загрузка одного файла NDJSON. Строки копятся в памяти до IMPORT_COMMIT_ROWS,
+    затем write вставляет их и запоминает позицию, коммит делает вызывающий"""
+
+    def __init__(self, job: str, allow_nonempty: bool = False, batch_size: int = IMPORT_BATCH_SIZE,
+                 commit_rows: int = IMPORT_COMMIT_ROWS):
+        self.job = job
+        self.allow_nonempty = allow_nonempty
+        self.batch_size = batch_size
+        self.commit_rows = commit_rows
+        self.pending: dict[str, list[dict]] = {name: [] for name in TABLES}
+        self.buffered = 0
+        self.line = 0
+        self.resumed_from = 0
+        self.inserted: Counter = Counter()
+        self.skipped: Counter = Counter()
+
+    def resume(self, session: Session) -> int:
+        """Номер последней закоммиченной строки этого задания, с нее продолжается загрузка.
+        Новое задание без allow_nonempty проверяет, что таблицы пусты."""
+        self.resumed_from = session.scalar(
+            select(import_progress.c.line).where(import_progress.c.job == self.job)) or 0
+        if not self.resumed_from and not self.allow_nonempty:
+            filled = [name for name, table in TABLES.items() if session.execute(select(table).limit(1)).first()]
+            if filled:
+                raise ImportConflict(f"Таблицы не пусты: {', '.join(filled)}. Ключи из файла совпадут с ключами базы; "
+                                     f"загрузка в заполненную базу - только с явным разрешением")
+        return self.resumed_from
+
+    def add(self, line: bytes | str) -> bool:
+        """Очередная строка файла. True - набралось на коммит.
+        Первые resumed_from строк загружены раньше и пропускаются."""
+        self.line += 1
+        if self.line <= self.resumed_from or not line.strip():
+            return False
+        try:
+            record = orjson.loads(line)
+            name, row = record["table"], record["row"]
+            columns = COLUMNS[name]
+            if not isinstance(row, dict) or not row.keys() <= COLUMN_SETS[name]:
+                raise ValueError(row)
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+            raise ValueError(f"Строка {self.line}: ожидается {{\"table\": ..., \"row\": {{...}}}}, "
+                             f"таблицы: {', '.join(TABLES)}") from None
+        self.pending[name].append({column: row.get(column) for column in columns})
+        self.buffered += 1
+        return self.buffered >= self.commit_rows
+
+    def write(self, session: Session) -> int:
+        """Вставка накопленных строк executemany-пачками и позиция задания в той же транзакции.
+        Если строка пользователя, категории или поста не вставилась из-за совпавшего ключа,
+        бросает ImportConflict до вставки ссылающихся строк - транзакцию откатывает вызывающий."""
+        for name, rows in self.pending.items():
+            for chunk in chunks(rows, self.batch_size):
+                result = session.execute(insert(TABLES[name]).on_conflict_do_nothing(), chunk)
+                inserted = max(result.rowcount, 0)
+                self.inserted[name] += inserted
+                self.skipped[name] += len(chunk) - inserted
+            if name in PARENT_TABLES and self.skipped[name]:
+                raise ImportConflict(f"Строк {name} с ключами, которые уже есть в базе: {self.skipped[name]}. "
+                                     f"Загрузка остановлена, строки текущей пачки (по {self.line}) не записаны")
+            rows.clear()
+        line = max(self.line, self.resumed_from)
+        session.execute(insert(import_progress).values(job=self.job, line=line).on_conflict_do_update(
+            index_elements=[import_progress.c.job], set_={"line": line}))
+        self.buffered = 0
+        return line
+
+    def result(self) -> dict:
+        return {"job": self.job, "line": self.line, "resumed_from": self.resumed_from,
+                "inserted": {name: self.inserted[name] for name in TABLES},
+                "skipped": {name: self.skipped[name] for name in TABLES}}
+
+
+def import_lines(session: Session, lines: Iterable, importer: Importer) -> dict:
+    """Загрузка из итератора строк с коммитом каждые importer.commit_rows строк.
+    При ошибке незакоммиченная пачка откатывается."""
+    try:
+        importer.resume(session)
+        for line in lines:
+            if importer.add(line):
+                importer.write(session)
+                session.commit()
+        importer.write(session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return importer.result()
+
+
+def drop_insert_triggers(connection: Connection):
+    """Отключает обновление поиска и счетчиков категорий на время массовой загрузки"""
+    for trigger in INSERT_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+
+
+def restore_insert_triggers(connection: Connection):
+    """Возвращает триггеры и пересчитывает то, что они поддерживают"""
+    init_search_index(connection)
+    rebuild_search_index(connection)
+    for statement in CATEGORY_STATS_TRIGGERS:
+        connection.execute(text(statement))
+    rebuild_category_stats(connection)
@@ -1,5 +1,16 @@
 import redis
+import redis.asyncio
+from decouple import Csv, config
 from fastapi.security import OAuth2PasswordBearer
 
-REDIS_CLIENT = redis.Redis(host='localhost', port=6379, db=0)
-OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="users/login/")
\ No newline at end of file
+REDIS_URL = config("REDIS_URL", default="redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=50, cast=int)
+
+REDIS_CLIENT = redis.Redis.from_url(REDIS_URL)
+# асинхронный клиент с общим пулом соединений для обработчиков запросов
+ASYNC_REDIS_CLIENT = redis.asyncio.Redis(
+    connection_pool=redis.asyncio.ConnectionPool.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS)
+)
+OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="users/login/")
+# пользователи с доступом к служебным маршрутам /admin
+ADMIN_USERNAMES = config("ADMIN_USERNAMES", default="", cast=Csv(post_process=frozenset))
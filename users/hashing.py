@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from decouple import config
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=4, cast=int)
+PASSWORD_HASH_QUEUE_SIZE = config("PASSWORD_HASH_QUEUE_SIZE", default=8, cast=int)
+PASSWORD_HASH_EXECUTOR = config("PASSWORD_HASH_EXECUTOR", default="thread") # thread или process
+
+# min/max совпадают с rounds, поэтому хеши с другой стоимостью считаются устаревшими
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+) #для хеширования паролей
+
+
+def _hash(password):
+    return pwd_context.hash(password)
+
+def _verify_and_update(plain_password, password):
+    return pwd_context.verify_and_update(plain_password, password)
+
+
+class PasswordHasher:
+    """Пул для bcrypt с ограниченной очередью.
+    Хеширование выполняется вне event loop. Если в работе и в очереди уже
+    workers + queue_size задач, новая сразу получает 503 вместо ожидания."""
+
+    def __init__(self, workers: int, queue_size: int, kind: str = "thread"):
+        self.workers = workers
+        self.limit = workers + queue_size
+        self.kind = kind
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _submit(self, func, *args):
+        # счетчик меняется только из event loop, блокировка не нужна
+        if self.pending >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, повторите попытку позже.",
+                headers={"Retry-After": "1"},
+            )
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(func, *args)
+        self.pending += 1
+        # освобождаем место, когда задача в пуле действительно завершилась: если клиент
+        # отключился и корутину отменили, начатый bcrypt все равно досчитывается.
+        # Колбэк вызывается в потоке пула, поэтому счетчик меняется через event loop.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(future)
+
+    def _release(self):
+        self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Хеш пароля"""
+        return await self._submit(_hash, password)
+
+    async def verify_and_update(self, plain_password: str, password: str) -> tuple[bool, str | None]:
+        """Проверка пароля. Второй элемент - новый хеш, если стоимость bcrypt изменилась"""
+        return await self._submit(_verify_and_update, plain_password, password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE, PASSWORD_HASH_EXECUTOR)
@@ -10,6 +10,7 @@ class User(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     username: Mapped[str] = mapped_column(String(50), unique=True)
     password: Mapped[str] = mapped_column(String(50))
-    posts: Mapped[List['Post']] = relationship(back_populates='author', cascade="all, delete-orphan")
+    # посты удаляет purge.jobs.Purger пачками, ORM не должна загружать и удалять их по одному
+    posts: Mapped[List['Post']] = relationship(back_populates='author', passive_deletes=True)
 
 
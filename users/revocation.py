@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict
+
+from decouple import config
+
+
+REVOCATION_BACKEND = config("REVOCATION_BACKEND", default="redis") # redis или memory
+REVOCATION_NEGATIVE_TTL_SECONDS = config("REVOCATION_NEGATIVE_TTL_SECONDS", default=1.0, cast=float)
+REVOCATION_NEGATIVE_CACHE_SIZE = config("REVOCATION_NEGATIVE_CACHE_SIZE", default=100000, cast=int)
+
+
+def token_id(payload: dict, token: str) -> str:
+    """jti токена; у старых токенов без jti - хеш самого токена"""
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+class MemoryRevocationBackend:
+    """Отозванные токены в памяти процесса: для тестов и одного воркера"""
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}
+
+    async def revoke(self, jti: str, ttl: int):
+        now = time.time()
+        # заодно чистим истекшие записи, чтобы словарь не рос бесконечно
+        for key in [key for key, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[key]
+        self._revoked[jti] = now + ttl
+
+    async def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+class RedisRevocationBackend:
+    """Отозванные токены в Redis через асинхронный клиент с пулом соединений"""
+
+    prefix = "revoked:"
+
+    def __init__(self, client):
+        self.client = client
+
+    async def revoke(self, jti: str, ttl: int):
+        await self.client.setex(self.prefix + jti, ttl, 1)
+
+    async def is_revoked(self, jti: str) -> bool:
+        return await self.client.exists(self.prefix + jti) > 0
+
+
+class RevocationStore:
+    """Отзыв токенов по jti.
+    Ответ "не отозван" кешируется локально на negative_ttl секунд, а одновременные
+    проверки одного jti ждут один общий запрос: большинство проверок не ходит в Redis. Отзыв на другом воркере станет виден здесь
+    с задержкой не больше negative_ttl; на своем воркере - сразу."""
+
+    def __init__(self, backend, negative_ttl: float, negative_cache_size: int):
+        self.backend = backend
+        self.negative_ttl = negative_ttl
+        self.negative_cache_size = negative_cache_size
+        self.local_hits = 0
+        self.backend_checks = 0
+        self._not_revoked: OrderedDict[str, float] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def revoke(self, jti: str, exp: float):
+        """TTL записи равен оставшемуся сроку жизни токена"""
+        self._not_revoked.pop(jti, None)
+        ttl = math.ceil(exp - time.time())
+        if ttl > 0:
+            await self.backend.revoke(jti, ttl)
+
+    async def is_revoked(self, jti: str) -> bool:
+        checked_at = self._not_revoked.get(jti)
+        now = time.monotonic()
+        if checked_at is not None and now - checked_at < self.negative_ttl:
+            self.local_hits += 1
+            return False
+        in_flight = self._in_flight.get(jti)
+        if in_flight is not None:
+            self.local_hits += 1
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise # отменили этот запрос
+                # отменили запрос, который делал проверку (клиент отключился) - проверяем заново
+                return await self.is_revoked(jti)
+
+        self.backend_checks += 1
+        future = self._in_flight[jti] = asyncio.get_running_loop().create_future()
+        try:
+            revoked = await self.backend.is_revoked(jti)
+            future.set_result(revoked)
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception() # ошибку получат ожидающие, для этой задачи она пробрасывается ниже
+            raise
+        finally:
+            del self._in_flight[jti]
+            if not future.done():
+                future.cancel() # эту задачу отменили, ожидающие не должны висеть на общем future
+        if revoked:
+            self._not_revoked.pop(jti, None)
+        else:
+            self._not_revoked[jti] = now
+            self._not_revoked.move_to_end(jti)
+            while len(self._not_revoked) > self.negative_cache_size:
+                self._not_revoked.popitem(last=False)
+        return revoked
+
+    def stats(self) -> dict:
+        return {"local_hits": self.local_hits, "backend_checks": self.backend_checks}
+
+
+def _create_backend():
+    if REVOCATION_BACKEND == "memory":
+        return MemoryRevocationBackend()
+    from .config import ASYNC_REDIS_CLIENT
+    return RedisRevocationBackend(ASYNC_REDIS_CLIENT)
+
+
+revocation_store = RevocationStore(_create_backend(), REVOCATION_NEGATIVE_TTL_SECONDS, REVOCATION_NEGATIVE_CACHE_SIZE)
@@ -1,92 +1,113 @@
 from fastapi import HTTPException, status
-from fastapi import APIRouter, Depends
-from database.base import get_db # импортируем функцию для получения соединения с БД
+from fastapi import APIRouter, Depends, Query
+from typing import Literal
+from database.base import get_async_db, get_read_db # импортируем функции для получения соединения с БД
+from database.pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, Page, keyset_page, ndjson_response
 from . models import User
-from sqlalchemy.orm import Session # импортируем класс для работы с сессиями
-from .scheme import UserInDB, UserCreate, Token
-from .utils import get_password_hash, verify_password, create_access_token, create_refresh_token, get_current_user, \
-    decode_token, check_token_expiration
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession # импортируем класс для работы с асинхронными сессиями
+from .scheme import Detail, RegisterResult, UserInDB, UserCreate, UserOut, Token
+from .utils import create_access_token, create_refresh_token, get_current_user, decode_token, check_token_expiration
+from .hashing import password_hasher
+from .cache import principal_cache
+from http_cache.utils import POSTS, response_cache
+from feed.queues import feed_queues
+from purge.jobs import purger
+from purge.utils import mark_user_deleted, visible_users
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from decouple import config
-from . config import REDIS_CLIENT, OAUTH2_SCHEME
-
-
-ACCESS_TOKEN_EXPIRE_MINUTES = int(config("ACCESS_TOKEN_EXPIRE_MINUTES"))
+from . config import OAUTH2_SCHEME
+from .revocation import revocation_store, token_id
 
 
 #---------------------------------------------------------------------------------------------
 def register_users_routers() -> APIRouter:
     routers = APIRouter(prefix="/users", tags=["Пользователи"])
 
-    @routers.post("/register/")
-    async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    @routers.post("/register/", response_model=RegisterResult)
+    async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
         """функция регистрации пользователя"""
-        existing_user = db.query(User).filter(User.username == user_data.username).first()
+        existing_user = await db.scalar(select(User).where(User.username == user_data.username))
         if existing_user:
             raise HTTPException(status_code=400, detail="Пользователь с таким именем уже существует")
 
-        password = get_password_hash(user_data.password)
+        password = await password_hasher.hash(user_data.password)
         new_user = User(username=user_data.username, password=password)
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
         return {"status_code": status.HTTP_201_CREATED, "message": "Пользователь успешно создан."}
 
 
     @routers.post("/login/", response_model=Token)
-    async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
         """Логин пользователя и выдача токена."""
-        user = db.query(User).filter(User.username == form_data.username).first()
+        user = await db.scalar(select(User).where(User.username == form_data.username, visible_users()))
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный логин или пароль.")
-        if not verify_password(form_data.password, user.password):
+        valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.password)
+        if not valid:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный логин или пароль.")
+        if new_hash: # стоимость bcrypt изменилась, перехешируем пароль
+            user.password = new_hash
+            await db.commit()
+            principal_cache.invalidate_user(user.id)
         access_token = create_access_token(data={"sub": user.username})
         refresh_token = create_refresh_token(data={"sub": user.username})
         return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 
-    @routers.get("/me")
+    @routers.get("/me", response_model=UserOut)
     async def read_users_me(current_user: User = Depends(get_current_user)):
         """Возвращает информацию о текущем пользователе"""
         return current_user
 
 
-    @routers.post("/logout")
+    @routers.post("/logout", response_model=Detail)
     async def logout(token: str = Depends(OAUTH2_SCHEME)):
-        """Функция для выхода из аккаунта"""
-        REDIS_CLIENT.setex(f"blacklist:{token}", ACCESS_TOKEN_EXPIRE_MINUTES, 0)
+        """Функция для выхода из аккаунта: токен отзывается до конца срока его действия"""
+        payload = decode_token(token)
+        if not payload:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен.")
+        await revocation_store.revoke(token_id(payload, token), payload["exp"])
+        principal_cache.invalidate_token(token)
         return {"detail": "Вы успешно вышли из аккаунта."}
 
 
-    @routers.delete("/delete")
-    async def delete_user(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    @routers.delete("/delete", response_model=Detail)
+    async def delete_user(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+        """Пользователь и его посты сразу скрываются, данные вычищает фоновая задача purge.jobs.Purger"""
         if db:
-            db.delete(current_user)
-            db.commit()
+            await mark_user_deleted(db, current_user.id)
+            await db.commit()
+            principal_cache.invalidate_user(current_user.id)
+            feed_queues.forget(current_user.id)
+            await response_cache.bump(POSTS) # вместе с пользователем скрыты его посты
+            purger.wake()
             return {"detail": "Пользователь успешно удален."}
 
 
-    @routers.get("/all_users")
-    async def get_all_users(db: Session = Depends(get_db)):
-        """Получение всех пользователей"""
-        if db:
-            users = db.query(User).all()
-            return users
+    @routers.get("/all_users", response_model=Page[UserOut])
+    async def get_all_users(limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT), after: str | None = None,
+                            format: Literal["json", "ndjson"] = "json", db: AsyncSession = Depends(get_read_db)):
+        """Получение пользователей постранично, format=ndjson - всех потоком"""
+        if format == "ndjson":
+            return ndjson_response(select(User).where(visible_users()), User.id, after, UserOut.model_validate)
+        return await keyset_page(db, select(User).where(visible_users()), User.id, limit, after)
 
     @routers.post("/refresh-token/", response_model=Token)
-    async def refresh_tokens(refresh_token: str, db: Session = Depends(get_db)):
+    async def refresh_tokens(refresh_token: str, db: AsyncSession = Depends(get_async_db)):
         """Обновление токенов с помощью refresh token."""
         decoded_payload = decode_token(refresh_token)
         if not decoded_payload:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token недействителен.")
+        if await revocation_store.is_revoked(token_id(decoded_payload, refresh_token)):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token недействителен.")
 
         # Проверяем, не истек ли refresh token
         if not check_token_expiration(decoded_payload):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Срок действия refresh token истек.")
 
         username = decoded_payload["sub"]
-        user = db.query(User).filter(User.username == username).first()
+        user = await db.scalar(select(User).where(User.username == username, visible_users()))
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Пользователь не найден.")
 
@@ -13,6 +13,22 @@ class UserInDB(UserCreate):
     class Config:
         from_attributes = True
 
+class UserOut(BaseModel):
+    """Публичные данные пользователя, без хеша пароля"""
+    id: int
+    username: str
+
+    class Config:
+        from_attributes = True
+
+class RegisterResult(BaseModel):
+    status_code: int
+    message: str
+
+class Detail(BaseModel):
+    """Ответ с текстом о результате действия"""
+    detail: str
+
 class Token(BaseModel):
     """Класс для хранения токена"""
     access_token: str
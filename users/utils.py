@@ -1,12 +1,18 @@
+import uuid
 from datetime import datetime, timedelta
 from decouple import config
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database.base import get_db
-from . config import REDIS_CLIENT, OAUTH2_SCHEME
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from database.base import get_async_db
+from . config import ADMIN_USERNAMES, OAUTH2_SCHEME
+from users.cache import principal_cache
+from users.hashing import pwd_context
+from purge.utils import is_user_deleted, visible_users
 from users.models import User
+from users.revocation import revocation_store, token_id
 
 
 SECRET_KEY = config('SECRET_KEY')
@@ -14,8 +20,6 @@ ALGORITHM = config("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(config("ACCESS_TOKEN_EXPIRE_MINUTES"))
 REFRESH_TOKEN_EXPIRES_DAYS = int(config("REFRESH_TOKEN_EXPIRES_DAYS"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto") #для хеширования паролей
-
 
 def verify_password(plain_password, password):  #проверка пароля
     return pwd_context.verify(plain_password, password)
@@ -29,7 +33,7 @@ def create_access_token(data: dict):
     Создаем токен, передавая в него словарь с данными, секретный ключ и алгоритм, который используем."""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex}) # jti - идентификатор для отзыва токена
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -39,29 +43,60 @@ def create_refresh_token(data: dict):
     Точно так же как и при создании"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=REFRESH_TOKEN_EXPIRES_DAYS)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(OAUTH2_SCHEME), db: Session = Depends(get_db)):
-    """Функция для получения текущего пользователя"""
+async def get_current_user(token: str = Depends(OAUTH2_SCHEME), db: AsyncSession = Depends(get_async_db)):
+    """Функция для получения текущего пользователя.
+    Проверенные токены кешируются, повторный запрос не делает jwt.decode и не читает пользователя из БД.
+    Остается только проверка отметки удаления по первичному ключу: delete_user сбрасывает кеш лишь
+    своего воркера, а другие воркеры иначе пускали бы удаленного пользователя до конца TTL кеша."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]) # декодируем токен
-        username = payload.get("sub") # получаем имя пользователя из токена
+        principal = principal_cache.get(token)
+        if principal is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]) # декодируем токен
+            username = payload.get("sub") # получаем имя пользователя из токена
+            jti = token_id(payload, token)
+        else:
+            jti = principal["jti"]
 
-        if REDIS_CLIENT.exists(f"blacklist_{token}") > 0: # проверяем, есть ли токен в черном списке
+        if await revocation_store.is_revoked(jti): # проверяем, не отозван ли токен
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Токен не действителен."
-            ) # если токен в черном списке, возвращаем ошибку
+            ) # если токен отозван, возвращаем ошибку
+
+        if principal is not None: # пользователь из кеша, присоединяем его к сессии без запроса
+            if await is_user_deleted(db, principal["id"]):
+                principal_cache.invalidate_token(token)
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Не авторизированный доступ.")
+            return await db.merge(user_from_principal(principal), load=False)
 
-        user = db.query(User).filter(User.username == username).first() # получаем пользователя из БД
+        user = await db.scalar(select(User).where(User.username == username, visible_users())) # получаем пользователя из БД
         if user is None: # если пользователь не найден, возвращаем ошибку
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Не авторизированный доступ.")
+        principal_cache.set(token, {**principal_from_user(user), "jti": jti}, payload["exp"])
         return user # если все ок, возвращаем пользователя
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен.")
 
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    """Текущий пользователь, если он есть в ADMIN_USERNAMES"""
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Недостаточно прав.")
+    return current_user
+
+def principal_from_user(user: User) -> dict:
+    """Снимок полей пользователя для кеша"""
+    return {"id": user.id, "username": user.username, "password": user.password}
+
+def user_from_principal(principal: dict) -> User:
+    """Отсоединенный объект User из снимка, готовый для session.merge(load=False)"""
+    user = User(id=principal["id"], username=principal["username"], password=principal["password"])
+    make_transient_to_detached(user)
+    return user
+
 def decode_token(token: str):
     """Функция для декодирования токена"""
     if token: